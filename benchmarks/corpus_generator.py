@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import shutil
+from typing import List, Dict, Any
+
+import numpy as np
+
+
+class CorpusGenerator:
+    """
+    Generates synthetic input files for all the tasks at a configurable scale.
+
+    Words are drawn from a Zipf distribution over a synthetic vocabulary, like words of natural text.
+    Persons are mentioned by full name or by one of their names, also with a Zipf distribution,
+    so a few persons appear often and connect to many others, like the main characters of a book.
+    The files are reproducible: the same parameters and seed always generate the same files.
+    """
+
+    SYLLABLES = [consonant + vowel for consonant in "bcdfghjklmnprstvz" for vowel in "aeiou"]
+    ZIPF_EXPONENT = 1.1
+    MIN_SENTENCE_LEN, MAX_SENTENCE_LEN = 4, 24
+    # probability of a sentence to mention a person
+    MENTION_PROBABILITY = 0.3
+    SENTENCES_PER_CHUNK = 100000
+    NUM_QUERIES, NUM_PAIRS = 50, 20
+
+    def __init__(self, num_sentences: int, num_persons: int, vocabulary_size: int = 20000, seed: int = 0):
+        self.num_sentences = num_sentences
+        self.num_persons = num_persons
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.vocabulary = self._words(vocabulary_size, num_syllables=3)
+        # person names have four syllables, so they never collide with the vocabulary
+        names = self._words(2 * num_persons, num_syllables=4)
+        self.persons = [(names[2 * i], names[2 * i + 1]) for i in range(num_persons)]
+
+    def _words(self, count: int, num_syllables: int) -> List[str]:
+        """
+        Draw distinct words made of syllables.
+
+        :param count: number of words
+        :param num_syllables: syllables in each word
+        :return: list of words
+        """
+        total = len(self.SYLLABLES) ** num_syllables
+        if count > total:
+            raise ValueError(f"Can't make {count} distinct words of {num_syllables} syllables.")
+        words = []
+        for index in self.rng.choice(total, size=count, replace=False).tolist():
+            syllables = []
+            for _ in range(num_syllables):
+                index, syllable = divmod(index, len(self.SYLLABLES))
+                syllables.append(self.SYLLABLES[syllable])
+            words.append(''.join(syllables))
+        return words
+
+    def _zipf(self, size: int, count: int) -> np.ndarray:
+        """
+        Draw ranks with a Zipf distribution.
+
+        :param size: number of ranks to draw from
+        :param count: number of draws
+        :return: drawn ranks
+        """
+        weights = 1 / np.arange(1, size + 1) ** self.ZIPF_EXPONENT
+        return self.rng.choice(size, size=count, p=weights / weights.sum())
+
+    def _sentence_chunk(self, num_sentences: int) -> List[str]:
+        """
+        Generate sentences.
+
+        :param num_sentences: number of sentences
+        :return: sentences as text
+        """
+        lengths = self.rng.integers(self.MIN_SENTENCE_LEN, self.MAX_SENTENCE_LEN + 1, size=num_sentences)
+        words = np.array(self.vocabulary, dtype=object)[self._zipf(len(self.vocabulary), int(lengths.sum()))]
+        bounds = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+        sentences = [words[start:end].tolist() for start, end in zip(bounds, bounds[1:])]
+
+        if self.num_persons > 0:
+            mentioning = np.flatnonzero(self.rng.random(num_sentences) < self.MENTION_PROBABILITY)
+            mentioned = self._zipf(self.num_persons, len(mentioning))
+            name_forms = self.rng.integers(0, 3, size=len(mentioning))  # full name, first name or last name
+            for sentence_id, person, name_form in zip(mentioning.tolist(), mentioned.tolist(), name_forms.tolist()):
+                first, last = self.persons[person]
+                name = [f"{first} {last}", first, last][name_form].title()
+                sentence = sentences[sentence_id]
+                sentence.insert(int(self.rng.integers(0, len(sentence) + 1)), name)
+        return [' '.join(sentence).capitalize() + '.' for sentence in sentences]
+
+    def generate(self, directory: str, remove_words_path: str) -> Dict[str, str]:
+        """
+        Write the input files of all the tasks to a directory.
+
+        :param directory: directory to write the files to
+        :param remove_words_path: remove words file to copy
+        :return: paths of the files, by name
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = {name: os.path.join(directory, file_name) for name, file_name in [
+            ("sentences", "sentences.csv"), ("names", "people.csv"), ("removewords", "REMOVEWORDS.csv"),
+            ("queries", "kseq_query_keys.json"), ("pairs", "people_connections.json")]}
+
+        shutil.copyfile(remove_words_path, paths["removewords"])
+        with open(paths["names"], 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Name", "Other Names"])
+            writer.writerows([f"{first} {last}".title(), ""] for first, last in self.persons)
+
+        queries = []
+        with open(paths["sentences"], 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["sentence"])
+            for start in range(0, self.num_sentences, self.SENTENCES_PER_CHUNK):
+                chunk = self._sentence_chunk(min(self.SENTENCES_PER_CHUNK, self.num_sentences - start))
+                writer.writerows([sentence] for sentence in chunk)
+                if not queries and chunk:
+                    queries = self._queries(chunk)
+
+        with open(paths["queries"], 'w', encoding='utf-8') as file:
+            json.dump({"keys": queries}, file)
+        with open(paths["pairs"], 'w', encoding='utf-8') as file:
+            json.dump({"keys": self._pairs()}, file)
+        return paths
+
+    def _queries(self, sentences: List[str]) -> List[List[str]]:
+        """
+        Pick sequences of 1 to 4 words from sentences, and a sequence that never appears.
+
+        :param sentences: sentences to pick from
+        :return: sequences as lists of words
+        """
+        queries = []
+        for sentence_id in self.rng.integers(0, len(sentences), size=self.NUM_QUERIES).tolist():
+            words = sentences[sentence_id].rstrip('.').lower().split()
+            seq_len = int(self.rng.integers(1, min(4, len(words)) + 1))
+            start = int(self.rng.integers(0, len(words) - seq_len + 1))
+            queries.append(words[start:start + seq_len])
+        queries.append(["zzz", "never", "appears"])
+        return queries
+
+    def _pairs(self) -> List[List[str]]:
+        """
+        Pick pairs of persons, mostly frequently mentioned ones.
+
+        :return: pairs of full names
+        """
+        if self.num_persons < 2:
+            return []
+        ranks = self._zipf(self.num_persons, 2 * self.NUM_PAIRS).reshape(-1, 2)
+        return [[' '.join(self.persons[a]), ' '.join(self.persons[b])] for a, b in ranks.tolist() if a != b]
+
+    def parameters(self) -> Dict[str, Any]:
+        """The parameters the files depend on, for telling if existing files can be reused"""
+        return {"num_sentences": self.num_sentences, "num_persons": self.num_persons,
+                "vocabulary_size": len(self.vocabulary), "seed": self.seed}
@@ -0,0 +1,232 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+from benchmarks.corpus_generator import CorpusGenerator
+
+# scale name: (number of sentences, number of persons)
+SCALES = {
+    "1k": (1000, 10),
+    "10k": (10000, 100),
+    "100k": (100000, 1000),
+    "1m": (1000000, 5000),
+    "10m": (10000000, 50000)
+}
+TASKS = ["1", "2", "3", "4", "5", "6", "7", "8"]
+REMOVE_WORDS_PATH = os.path.join("tests", "data", "REMOVEWORDS.csv")
+
+
+def task_arguments(task_num: str, paths: Dict[str, str]) -> List[str]:
+    """
+    Build the command line arguments of a task over generated files.
+
+    :param task_num: task number
+    :param paths: paths of the generated files
+    :return: arguments for main.py
+    """
+    graph_args = ["--windowsize", "5", "--threshold", "2"]
+    specific_args = {
+        "2": ["--maxk", "3"],
+        "4": ["--qsek_query_path", paths["queries"]],
+        "5": ["--maxk", "3"],
+        "6": graph_args,
+        "7": ["--pairs", paths["pairs"], "--maximal_distance", "4"] + graph_args,
+        "8": ["--pairs", paths["pairs"], "--fixed_length", "3", "--search_budget", "100000"] + graph_args
+    }
+    return (["-t", task_num, "-s", paths["sentences"], "-n", paths["names"], "-r", paths["removewords"]]
+            + specific_args.get(task_num, []))
+
+
+def measure_task(arguments: List[str]) -> Tuple[float, float]:
+    """
+    Run a task through TaskRunner, in a fresh worker process so its peak memory is its own.
+
+    :param arguments: arguments for main.py
+    :return: wall time in seconds, from loading the files to the result, and peak memory in MB
+    """
+    from main import create_parser
+    from src.tasks.task_runner import TaskRunner
+
+    args = create_parser().parse_args(arguments)
+    start = time.perf_counter()
+    TaskRunner(args).run_task()
+    wall_time = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10  # bytes on macOS, KB on Linux
+    return wall_time, peak_mb
+
+
+def generate_scale(scale: str, data_dir: str, seed: int) -> Dict[str, str]:
+    """
+    Generate the files of a scale, reusing files generated earlier with the same parameters.
+
+    :param scale: scale name
+    :param data_dir: directory to keep the generated files of all scales in
+    :param seed: random seed
+    :return: paths of the generated files
+    """
+    num_sentences, num_persons = SCALES[scale]
+    generator = CorpusGenerator(num_sentences, num_persons, seed=seed)
+    directory = os.path.join(data_dir, scale)
+    parameters_path = os.path.join(directory, "parameters.json")
+    if os.path.exists(parameters_path):
+        with open(parameters_path, 'r') as file:
+            stored = json.load(file)
+        if stored["parameters"] == generator.parameters():
+            return stored["paths"]
+
+    paths = generator.generate(directory, REMOVE_WORDS_PATH)
+    with open(parameters_path, 'w') as file:
+        json.dump({"parameters": generator.parameters(), "paths": paths}, file, indent=2)
+    return paths
+
+
+def run(scales: List[str], tasks: List[str], data_dir: str, seed: int, repeat: int) -> Dict[str, Any]:
+    """
+    Time each task at each scale.
+
+    :param scales: scale names, from small to large
+    :param tasks: task numbers
+    :param data_dir: directory of the generated files
+    :param seed: random seed of the generated files
+    :param repeat: number of runs of each task, the fastest one is kept
+    :return: {scale: {task: {"wall_time": seconds, "peak_memory_mb": MB}}}
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        paths = generate_scale(scale, data_dir, seed)
+        results[scale] = {}
+        for task_num in tasks:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    runs.append(executor.submit(measure_task, task_arguments(task_num, paths)).result())
+            wall_time = min(wall_time for wall_time, _ in runs)
+            peak_memory_mb = min(peak for _, peak in runs)
+            results[scale][task_num] = {"wall_time": round(wall_time, 4), "peak_memory_mb": round(peak_memory_mb, 1)}
+            print(f"scale {scale:>4}  task {task_num}  {wall_time:9.3f} s  {peak_memory_mb:9.1f} MB", flush=True)
+    return results
+
+
+def scaling_exponents(results: Dict[str, Any], tasks: List[str]) -> Dict[str, List[float]]:
+    """
+    Estimate how the time of each task grows with the number of sentences, between consecutive scales.
+    An exponent of 1 is linear growth, 2 is quadratic.
+
+    :param results: benchmark results
+    :param tasks: task numbers
+    :return: task mapped to the exponent between each two consecutive scales
+    """
+    scales = list(results)
+    exponents = {}
+    for task_num in tasks:
+        exponents[task_num] = []
+        for smaller, larger in zip(scales, scales[1:]):
+            size_ratio = SCALES[larger][0] / SCALES[smaller][0]
+            time_ratio = results[larger][task_num]["wall_time"] / max(results[smaller][task_num]["wall_time"], 1e-9)
+            exponents[task_num].append(round(math.log(time_ratio) / math.log(size_ratio), 2))
+    return exponents
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Find measurements that got worse than the baseline by more than the tolerance.
+    Differences under 50 ms or 10 MB are ignored as noise.
+
+    :param results: benchmark results
+    :param baseline: baseline results
+    :param tolerance: allowed relative growth, 0.2 allows 20%
+    :return: description of each regression
+    """
+    regressions = []
+    for scale, task_results in results.items():
+        for task_num, measured in task_results.items():
+            expected = baseline.get(scale, {}).get(task_num)
+            if expected is None:
+                continue
+            for metric, noise in (("wall_time", 0.05), ("peak_memory_mb", 10)):
+                if measured[metric] > expected[metric] * (1 + tolerance) and \
+                        measured[metric] - expected[metric] > noise:
+                    regressions.append(f"scale {scale} task {task_num} {metric}: "
+                                       f"{measured[metric]} vs baseline {expected[metric]}")
+    return regressions
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        prog='Text Analyzer benchmarks',
+    )
+    parser.add_argument('--scales',
+                        nargs='+',
+                        choices=list(SCALES),
+                        help="scales to run, from small to large",
+                        default=["1k", "10k", "100k"])
+    parser.add_argument('--tasks',
+                        nargs='+',
+                        choices=TASKS,
+                        help="task numbers to time",
+                        default=TASKS)
+    parser.add_argument('--data_dir',
+                        help="directory to keep the generated files in",
+                        default=os.path.join("benchmarks", "data"))
+    parser.add_argument('--seed',
+                        type=int,
+                        help="random seed of the generated files",
+                        default=0)
+    parser.add_argument('--repeat',
+                        type=int,
+                        help="number of runs of each task, the fastest is kept",
+                        default=1)
+    parser.add_argument('--output',
+                        help="json file to write the results to")
+    parser.add_argument('--baseline',
+                        help="json file with results of an earlier run to compare to")
+    parser.add_argument('--save_baseline',
+                        action='store_true',
+                        help="write the results to the baseline file instead of comparing to it")
+    parser.add_argument('--tolerance',
+                        type=float,
+                        help="allowed relative slowdown or memory growth against the baseline",
+                        default=0.2)
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    scales = sorted(args.scales, key=lambda scale: SCALES[scale][0])
+    results = run(scales, args.tasks, args.data_dir, args.seed, args.repeat)
+    report = {"results": results, "scaling_exponents": scaling_exponents(results, args.tasks)}
+
+    print("scaling exponents between consecutive scales:")
+    for task_num, exponents in report["scaling_exponents"].items():
+        print(f"  task {task_num}: {exponents}")
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline is None:
+        return
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        return
+    with open(args.baseline, 'r') as file:
+        regressions = compare(results, json.load(file)["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 import argparse
+import sys
+from typing import Optional
 
+from src.tasks.result_writer import ResultWriter
 from src.tasks.task_runner import TaskRunner
+from src.tasks.task_server import TaskServer
 
 
 def create_parser():
@@ -9,8 +13,13 @@ def create_parser():
     )
     # General arguments
     parser.add_argument('-t', '--task',
-                        help="task number",
-                        required=True)
+                        nargs='+',
+                        help="task numbers, several tasks share the loaded data, intermediate results and arguments")
+    parser.add_argument('--task_spec',
+                        action='append',
+                        type=TaskRunner.parse_task_spec,
+                        help="a task with its own arguments over the shared ones, can be repeated, "
+                             "e.g. 7:windowsize=5,threshold=2,maximal_distance=4")
     parser.add_argument('-s', '--sentences',
                         help="Sentence file path")
     parser.add_argument('-n', '--names',
@@ -18,14 +27,66 @@ def create_parser():
     parser.add_argument('-r', '--removewords',
                         help="Words to remove file path")
     parser.add_argument('-p', '--preprocessed',
-                        action='append',
                         help="json with preprocessed data",
                         default=None)
+    parser.add_argument('--corpus_cache',
+                        help="binary preprocessed corpus file, rebuilt when the input files change")
+    parser.add_argument('--suffix_array',
+                        help="suffix array file to search sequences with, built there if missing or stale (task 4)")
+    parser.add_argument('--chunksize',
+                        type=int,
+                        help="number of sentence rows to read and process at once")
+    parser.add_argument('--workers',
+                        type=int,
+                        help="number of worker processes for parallel tasks",
+                        default=1)
+    parser.add_argument('--export_partial',
+                        help="file to export the partial results of this shard to")
+    parser.add_argument('--shard_index',
+                        type=int,
+                        help="position of this shard in the whole corpus",
+                        default=0)
+    parser.add_argument('--merge',
+                        nargs='+',
+                        help="partial results files to merge into the task output (tasks 2, 3 and 6)")
+    parser.add_argument('--output_format',
+                        choices=ResultWriter.FORMATS,
+                        help="write the result as it is computed in this format instead of printing it")
+    parser.add_argument('--output',
+                        help="file to write the result to with --output_format, standard output if not given")
+    parser.add_argument('--result_cache',
+                        help="directory to cache task results and intermediate counts in, keyed by the input files")
+    parser.add_argument('--result_cache_size',
+                        type=int,
+                        help="maximal size of the result cache in MB, least recently used entries are removed",
+                        default=1024)
+    parser.add_argument('--bypass_cache',
+                        action='store_true',
+                        help="compute the results even if they are cached, and replace the cached ones")
+    parser.add_argument('--serve',
+                        action='store_true',
+                        help="keep the data loaded and answer JSON task queries over HTTP")
+    parser.add_argument('--host',
+                        help="address the server listens on",
+                        default='127.0.0.1')
+    parser.add_argument('--port',
+                        type=int,
+                        help="port the server listens on",
+                        default=8765)
 
     # Task specific arguments
     parser.add_argument('--maxk',
                         type=int,
                         help="Max k")
+    parser.add_argument('--memory_budget',
+                        type=int,
+                        help="maximal number of distinct sequences kept in memory while counting, spilled to disk beyond it (task 2)")
+    parser.add_argument('--top',
+                        type=int,
+                        help="estimate only this many most frequent sequences of each length (task 2)")
+    parser.add_argument('--sketch_capacity',
+                        type=int,
+                        help="number of sequences tracked for each length when estimating the top sequences")
     parser.add_argument('--fixed_length',
                         type=int,
                         help="fixed length to find")
@@ -37,9 +98,19 @@ def create_parser():
     parser.add_argument('--threshold',
                         type=int,
                         help="graph connection threshold")
+    parser.add_argument('--thresholds',
+                        type=int,
+                        nargs='+',
+                        help="graph connection thresholds to sweep in one run (task 6)")
+    parser.add_argument('--pair_counts',
+                        help="json file to load and save the pair window counts, of every window size counted")
     parser.add_argument('--maximal_distance',
                         type=int,
                         help="maximal distance between nodes in graph")
+    parser.add_argument('--search_budget',
+                        type=int,
+                        help="maximal search steps for each pair when looking for fixed length paths, "
+                             "pairs that run out of steps are reported as null")
     parser.add_argument('--qsek_query_path',
                         help="json file with query path")
 
@@ -49,9 +120,32 @@ def create_parser():
 def main():
     parser = create_parser()
     args = parser.parse_args()
-    result = TaskRunner(args).run_task()
+    if args.serve:
+        TaskServer(TaskRunner(args).analyzer).serve(args.host, args.port)
+        return
+    if args.task is None and args.task_spec is None:
+        parser.error("the following arguments are required: -t/--task or --task_spec")
+
+    if args.merge is not None:
+        result = TaskRunner.merge_partials(args)
+    elif args.export_partial is not None:
+        result = TaskRunner(args).export_partial()
+    elif args.output_format is not None:
+        write_result(TaskRunner(args).run_task(stream=True), args.output_format, args.output)
+        return
+    else:
+        result = TaskRunner(args).run_task()
     print(result)
 
 
+def write_result(result, output_format: str, path: Optional[str] = None) -> None:
+    """Write a result with the result writer, to a file or to the standard output"""
+    if path is None:
+        ResultWriter(sys.stdout, output_format).write(result)
+        return
+    with open(path, 'w', encoding='utf-8') as file:
+        ResultWriter(file, output_format).write(result)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from ..utils.files_utils import json_default
+
+
+class ResultCache:
+    """
+    Directory of task results from earlier runs, so a task repeated on the same inputs isn't computed again.
+
+    Results are keyed by the hash of the input files and the arguments the task depends on,
+    and stored as JSON files. Intermediate artifacts, such as the pair window counts the
+    connection graphs are built from, are stored next to them under their own names.
+    Reading a file marks it as recently used, and the least recently used files are removed
+    when the directory grows beyond its size limit. The memo of input file hashes is never removed.
+    """
+
+    HASHES_NAME = "file_hashes.json"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(inputs_hash: str, task_num: str, task_args: Dict[str, Any]) -> str:
+        """
+        Build the key of a task result.
+
+        :param inputs_hash: hash of the content of the task's input files
+        :param task_num: task number
+        :param task_args: arguments the task result depends on
+        :return: hex digest key
+        """
+        data = json.dumps({"inputs": inputs_hash, "task": task_num, "args": task_args}, sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def path(self, name: str) -> str:
+        """
+        Get the path of a cache file.
+
+        :param name: file name
+        :return: path in the cache directory
+        """
+        return os.path.join(self.directory, name)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a cached result.
+
+        :param key: key of the result
+        :return: the result, None if it isn't cached
+        """
+        path = self.path(f"{key}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                result = json.load(file)
+        except (OSError, ValueError):
+            return None
+        self.touch(path)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store a result, and evict the least recently used files if the cache is too big.
+
+        :param key: key of the result
+        :param result: the result
+        """
+        path = self.path(f"{key}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(result, file, default=json_default, separators=(',', ':'))
+        os.replace(tmp_path, path)  # readers never see a partially written result
+        self.evict()
+
+    @staticmethod
+    def touch(path: str) -> None:
+        """
+        Mark a cache file as recently used.
+
+        :param path: path of the file
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache fits its size limit."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp') and entry.name != self.HASHES_NAME:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
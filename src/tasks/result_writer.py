@@ -0,0 +1,77 @@
+import json
+from collections.abc import Iterator
+from typing import Any, Dict, TextIO
+
+from ..utils.files_utils import json_default
+
+
+class ResultWriter:
+    """
+    Writes task results as they are produced, as JSON or as NDJSON.
+
+    Results may hold generators, which are consumed and written one item at a time,
+    so a generated result is never held in memory as a whole.
+        json:   the same document as the task result
+        ndjson: a line for each item of a task's result, {"Question N": {"result name": item}}
+    """
+
+    FORMATS = ("json", "ndjson")
+
+    def __init__(self, file: TextIO, output_format: str = "json"):
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Invalid output format: {output_format}")
+        self.file = file
+        self.output_format = output_format
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """
+        Write the result of one or more tasks.
+
+        :param result: task results by question, as returned by TaskRunner.run_task
+        """
+        if self.output_format == "json":
+            self._write_json(result)
+            self.file.write('\n')
+        else:
+            for question, task_result in result.items():
+                for name, value in task_result.items():
+                    for item in self._items(value):
+                        self.file.write(json.dumps({question: {name: item}}, default=json_default))
+                        self.file.write('\n')
+        self.file.flush()
+
+    @staticmethod
+    def _items(value: Any) -> Iterator[Any]:
+        """
+        Get the items of a value, a single item if it isn't a list or a generator.
+
+        :param value: a value of a task result
+        :return: iterator of items
+        """
+        if isinstance(value, (list, Iterator)):
+            return iter(value)
+        return iter([value])
+
+    def _write_json(self, value: Any) -> None:
+        """
+        Write a value as JSON, writing each item of a generator as soon as it is produced.
+
+        :param value: the value
+        """
+        if isinstance(value, dict):
+            self.file.write('{')
+            for i, (key, item) in enumerate(value.items()):
+                if i > 0:
+                    self.file.write(', ')
+                self.file.write(json.dumps(key) + ': ')
+                self._write_json(item)
+            self.file.write('}')
+        elif isinstance(value, Iterator):
+            self.file.write('[')
+            for i, item in enumerate(value):
+                if i > 0:
+                    self.file.write(', ')
+                self._write_json(item)
+            self.file.write(']')
+        else:
+            self.file.write(json.dumps(value, default=json_default))
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from src.text_analyzer.analyzer import TextAnalyzer
 from src.utils.files_utils import read_json_file
@@ -24,14 +24,25 @@ class TaskDefinitions:
         :return: processed sentences and names
         """
         return {
-            "Processed Sentences": self.analyzer.sentences,
+            "Processed Sentences": list(self.analyzer.sentences),
             "Processed Names": self.analyzer.persons
         }
 
-    def task_2(self, maxk: int) -> Dict[str, Any]:
-        """Count sequences up to maxk length"""
+    def task_2(self,
+               maxk: int,
+               workers: int = 1,
+               memory_budget: Optional[int] = None,
+               stream: bool = False) -> Dict[str, Any]:
+        """Count sequences up to maxk length, as a generator of the counts of each length if stream"""
+        counts = self.analyzer.iter_sequence_counts(maxk, workers, memory_budget)
         return {
-            f"{maxk}-Seq Counts": self.analyzer.count_sequences(maxk)
+            f"{maxk}-Seq Counts": counts if stream else list(counts)
+        }
+
+    def task_2_top(self, maxk: int, top_n: int, capacity: Optional[int] = None) -> Dict[str, Any]:
+        """Estimate the most frequent sequences up to maxk length"""
+        return {
+            f"{maxk}-Seq Top {top_n} Estimates": self.analyzer.top_sequences(maxk, top_n, capacity)
         }
 
     def task_3(self) -> Dict[str, Any]:
@@ -47,10 +58,11 @@ class TaskDefinitions:
                 path_to_sequences=qsek_query_path)
         }
 
-    def task_5(self, maxk: int) -> Dict[str, Any]:
-        """Analyze person contexts"""
+    def task_5(self, maxk: int, workers: int = 1, stream: bool = False) -> Dict[str, Any]:
+        """Analyze person contexts, as a generator of the context of each person if stream"""
+        contexts = self.analyzer.iter_people_context(seq_len=maxk, workers=workers)
         return {
-            "Person Contexts and K-Seqs": self.analyzer.people_context(seq_len=maxk)
+            "Person Contexts and K-Seqs": contexts if stream else list(contexts)
         }
 
     def task_6(self, windowsize: int, threshold: int) -> Dict[str, Any]:
@@ -59,6 +71,12 @@ class TaskDefinitions:
             "Pair Matches": self.analyzer.find_connections(windowsize, threshold)
         }
 
+    def task_6_sweep(self, windowsize: int, thresholds: List[int]) -> Dict[str, Any]:
+        """Find connections between persons for many thresholds"""
+        return {
+            "Threshold Sweep": self.analyzer.connections_sweep(windowsize, thresholds)
+        }
+
     def task_7(self, pairs_path: str, windowsize: int, threshold: int, maximal_distance: int) -> Dict[str, Any]:
         """Find indirect connections between persons"""
         pairs_raw = [sorted(pair) for pair in read_json_file(pairs_path)["keys"]]
@@ -70,7 +88,12 @@ class TaskDefinitions:
         )
         return {"Pair Matches": found_paths}
 
-    def task_8(self, pairs_path: str, windowsize: int, threshold: int, fixed_length: int) -> Dict[str, Any]:
+    def task_8(self,
+               pairs_path: str,
+               windowsize: int,
+               threshold: int,
+               fixed_length: int,
+               search_budget: Optional[int] = None) -> Dict[str, Any]:
         """Find fixed length paths between persons"""
         pairs_raw = [sorted(pair) for pair in read_json_file(pairs_path)["keys"]]
         found_paths = self.analyzer.fixed_length_paths(
@@ -78,6 +101,7 @@ class TaskDefinitions:
             window_size=windowsize,
             threshold=threshold,
             maximal_distance=fixed_length,
-            k=fixed_length
+            k=fixed_length,
+            search_budget=search_budget
         )
         return {"Pair Matches": found_paths}
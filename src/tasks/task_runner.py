@@ -1,17 +1,59 @@
-from typing import Dict, Any
+import os
+from argparse import Namespace
+from collections.abc import Iterator
+from typing import Dict, Any, List, Optional, Tuple, Callable
 
+from .result_cache import ResultCache
 from .task_definitions import TaskDefinitions
 from ..text_analyzer.analyzer import TextAnalyzer
-from ..utils.files_utils import read_json_file
+from ..text_analyzer.corpus_cache import CorpusCache
+from ..text_analyzer.partials import PartialResults
+from ..utils.files_utils import read_json_file, hash_files_memoized
 
 
 class TaskRunner:
     """Task runner"""
 
+    # arguments each task's result depends on, and its input files besides the text files
+    TASK_ARGUMENTS = {
+        "1": [], "2": ["maxk", "top", "sketch_capacity"], "3": [], "4": [], "5": ["maxk"],
+        "6": ["windowsize", "threshold", "thresholds"],
+        "7": ["windowsize", "threshold", "maximal_distance"],
+        "8": ["windowsize", "threshold", "fixed_length", "search_budget"]
+    }
+    TASK_FILES = {"4": ["qsek_query_path"], "7": ["pairs"], "8": ["pairs"]}
+
     def __init__(self, args):
-        self.analyzer = self._initialize_analyzer(args)
-        self.task_definitions = TaskDefinitions(self.analyzer)
         self.args = args
+        self.result_cache = None
+        if args.result_cache is not None:
+            self.result_cache = ResultCache(args.result_cache, args.result_cache_size * 2 ** 20)
+        self._inputs_hash: Optional[str] = None
+        # the data is only loaded when a task is computed, so cached results skip loading it
+        self._analyzer: Optional[TextAnalyzer] = None
+        self._task_definitions: Optional[TaskDefinitions] = None
+
+    @property
+    def analyzer(self) -> TextAnalyzer:
+        """The analyzer of the input files, loaded on first use"""
+        if self._analyzer is None:
+            self._analyzer = self._initialize_analyzer(self.args)
+            if self.args.pair_counts is not None and os.path.exists(self.args.pair_counts):
+                self._analyzer.load_pair_counts(self.args.pair_counts)
+            cached_pair_counts = self._cached_pair_counts_path()
+            if cached_pair_counts is not None and not self.args.bypass_cache and os.path.exists(cached_pair_counts):
+                self._analyzer.load_pair_counts(cached_pair_counts)
+                self.result_cache.touch(cached_pair_counts)
+            if self.args.suffix_array is not None:
+                self._analyzer.use_suffix_array(self.args.suffix_array)
+        return self._analyzer
+
+    @property
+    def task_definitions(self) -> TaskDefinitions:
+        """The task definitions over the analyzer"""
+        if self._task_definitions is None:
+            self._task_definitions = TaskDefinitions(self.analyzer)
+        return self._task_definitions
 
     @staticmethod
     def _initialize_analyzer(args) -> TextAnalyzer:
@@ -23,37 +65,202 @@ class TaskRunner:
                 persons=data["Question 1"]["Processed Names"],
                 path_to_unwanted_words=args.removewords
             )
+        if args.corpus_cache is not None:
+            return TaskRunner._initialize_cached_analyzer(args)
         return TextAnalyzer(
             path_to_sentences=args.sentences,
             path_to_persons=args.names,
-            path_to_unwanted_words=args.removewords
+            path_to_unwanted_words=args.removewords,
+            chunk_size=args.chunksize
         )
 
-    def run_task(self) -> Dict[str, Any]:
-        """Run the specified task"""
-        task_map = {
-            "1": self.task_definitions.task_1,
-            "2": lambda: self.task_definitions.task_2(self.args.maxk),
-            "3": self.task_definitions.task_3,
-            "4": lambda: self.task_definitions.task_4(self.args.qsek_query_path),
-            "5": lambda: self.task_definitions.task_5(self.args.maxk),
-            "6": lambda: self.task_definitions.task_6(self.args.windowsize, self.args.threshold),
+    @staticmethod
+    def _initialize_cached_analyzer(args) -> TextAnalyzer:
+        """
+        Initialize the analyzer from the binary corpus cache.
+        The sentences, names and remove words files are only hashed when their size or modification time
+        changed since they were last hashed, and the cache is rebuilt if their content changed.
+        """
+        source_paths = [args.sentences, args.names, args.removewords]
+        source_hash = hash_files_memoized(source_paths, f"{args.corpus_cache}.hashes")
+        cached = CorpusCache.load(args.corpus_cache, source_hash)
+        if cached is not None:
+            corpus, persons = cached
+            return TextAnalyzer(corpus=corpus, persons=persons, path_to_unwanted_words=args.removewords)
+
+        analyzer = TextAnalyzer(
+            path_to_sentences=args.sentences,
+            path_to_persons=args.names,
+            path_to_unwanted_words=args.removewords,
+            chunk_size=args.chunksize
+        )
+        CorpusCache.save(args.corpus_cache, analyzer.corpus, analyzer.persons, source_hash)
+        return analyzer
+
+    @staticmethod
+    def _task_numbers(args) -> List[str]:
+        """The task numbers to run, in order and without duplicates"""
+        if args.task is None:
+            return []
+        tasks = args.task if isinstance(args.task, list) else [args.task]
+        return list(dict.fromkeys(tasks))
+
+    @classmethod
+    def parse_task_spec(cls, spec: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Parse a task with its own arguments, such as "7:windowsize=5,threshold=2,maximal_distance=4".
+        Only the arguments the task depends on can be given, values are numbers except file paths,
+        and the thresholds of task 6 are separated by spaces.
+
+        :param spec: task number, and comma separated name=value arguments after a colon
+        :return: task number and its arguments
+        """
+        task_num, _, arguments_text = spec.partition(':')
+        task_num = task_num.strip()
+        if task_num not in cls.TASK_ARGUMENTS:
+            raise ValueError(f"Invalid task number: {task_num}")
+
+        arguments = {}
+        for argument in filter(None, arguments_text.split(',')):
+            name, _, value = argument.partition('=')
+            name, value = name.strip(), value.strip()
+            if name in cls.TASK_FILES.get(task_num, []):
+                arguments[name] = value
+            elif name == "thresholds":
+                arguments[name] = [int(threshold) for threshold in value.split()]
+            elif name in cls.TASK_ARGUMENTS[task_num]:
+                arguments[name] = int(value)
+            else:
+                raise ValueError(f"Task {task_num} has no argument {name}")
+        return task_num, arguments
+
+    def _task_specs(self) -> List[Tuple[str, str, Any]]:
+        """
+        The tasks to run with their arguments: the tasks of -t with the shared arguments,
+        then each --task_spec with its own arguments on top of the shared ones.
+
+        :return: list of (result name, task number, arguments)
+        """
+        specs = [(f"Question {task_num}", task_num, self.args) for task_num in self._task_numbers(self.args)]
+        for task_num, arguments in self.args.task_spec or []:
+            spec_text = ','.join(f"{name}={' '.join(map(str, value)) if isinstance(value, list) else value}"
+                                 for name, value in arguments.items())
+            specs.append((f"Question {task_num}: {spec_text}", task_num, Namespace(**{**vars(self.args), **arguments})))
+        return specs
+
+    def _task_map(self, args, stream: bool) -> Dict[str, Callable[[], Dict[str, Any]]]:
+        """The computation of each task with the given arguments"""
+        return {
+            "1": lambda: self.task_definitions.task_1(),
+            "2": lambda: self.task_definitions.task_2(args.maxk, args.workers, args.memory_budget, stream)
+            if args.top is None
+            else self.task_definitions.task_2_top(args.maxk, args.top, args.sketch_capacity),
+            "3": lambda: self.task_definitions.task_3(),
+            "4": lambda: self.task_definitions.task_4(args.qsek_query_path),
+            "5": lambda: self.task_definitions.task_5(args.maxk, args.workers, stream),
+            "6": lambda: self.task_definitions.task_6(args.windowsize, args.threshold)
+            if args.thresholds is None
+            else self.task_definitions.task_6_sweep(args.windowsize, args.thresholds),
             "7": lambda: self.task_definitions.task_7(
-                self.args.pairs,
-                self.args.windowsize,
-                self.args.threshold,
-                self.args.maximal_distance
+                args.pairs,
+                args.windowsize,
+                args.threshold,
+                args.maximal_distance
             ),
             "8": lambda: self.task_definitions.task_8(
-                self.args.pairs,
-                self.args.windowsize,
-                self.args.threshold,
-                self.args.fixed_length
+                args.pairs,
+                args.windowsize,
+                args.threshold,
+                args.fixed_length,
+                args.search_budget
             )
         }
 
-        task_num = self.args.task
-        if task_num not in task_map:
-            raise ValueError(f"Invalid task number: {task_num}")
+    def run_task(self, stream: bool = False) -> Dict[str, Any]:
+        """
+        Run the specified tasks.
+        With stream, the long results of tasks 2 and 5 are generators that compute them while they are written.
+        """
+        task_specs = self._task_specs()
+        for _, task_num, _ in task_specs:
+            if task_num not in self.TASK_ARGUMENTS:
+                raise ValueError(f"Invalid task number: {task_num}")
+
+        # tasks share the analyzer, so intermediates like the name to sentences map, the n-gram index,
+        # the pair counts of each window size and the connection graphs are computed once for all of them
+        result = {}
+        for question, task_num, args in task_specs:
+            key = self._cache_key(task_num, args) if self.result_cache is not None else None
+            cached = self.result_cache.get(key) if key is not None and not self.args.bypass_cache else None
+            if cached is not None:
+                result[question] = cached
+                continue
+
+            task_result = self._task_map(args, stream)[task_num]()
+            # generated results are written as they are computed, so they can't be stored
+            if key is not None and not any(isinstance(value, Iterator) for value in task_result.values()):
+                self.result_cache.put(key, task_result)
+            result[question] = task_result
+
+        # pair counts are only written when this run counted them, and are kept for each window size
+        counted_windows = self._analyzer.counted_pair_windows() if self._analyzer is not None else []
+        if self.args.pair_counts is not None and counted_windows:
+            self.analyzer.save_pair_counts(self.args.pair_counts, counted_windows)
+        if counted_windows and self._cached_pair_counts_path() is not None:
+            self.analyzer.save_pair_counts(self._cached_pair_counts_path(), counted_windows)
+            self.result_cache.evict()
+        return result
+
+    def _hash_files(self, paths: List[Optional[str]]) -> str:
+        """Hash of files, only read again when their size or modification time changed since they were hashed"""
+        return hash_files_memoized(paths, self.result_cache.path(ResultCache.HASHES_NAME))
+
+    def _inputs_digest(self) -> str:
+        """Hash of the text input files, computed once"""
+        if self._inputs_hash is None:
+            self._inputs_hash = self._hash_files([self.args.sentences, self.args.names,
+                                                  self.args.removewords, self.args.preprocessed])
+        return self._inputs_hash
+
+    def _cache_key(self, task_num: str, args) -> str:
+        """Key of a task's result with the given arguments in the result cache"""
+        task_files = [getattr(args, name) for name in self.TASK_FILES.get(task_num, [])]
+        inputs_hash = self._inputs_digest() if not task_files else \
+            self._inputs_digest() + self._hash_files(task_files)
+        task_args = {name: getattr(args, name) for name in self.TASK_ARGUMENTS[task_num]}
+        return ResultCache.key(inputs_hash, task_num, task_args)
+
+    def _cached_pair_counts_path(self) -> Optional[str]:
+        """Path of the pair window counts of all window sizes in the result cache, None if there is no cache"""
+        if self.result_cache is None:
+            return None
+        key = ResultCache.key(self._inputs_digest(), "pair_counts", {})
+        return self.result_cache.path(f"pairs_{key}.json")
+
+    def export_partial(self) -> Dict[str, Any]:
+        """Export the partial results of this shard to the given file"""
+        self.analyzer.export_partial(
+            path=self.args.export_partial,
+            shard_index=self.args.shard_index,
+            maxk=self.args.maxk,
+            window_size=self.args.windowsize
+        )
+        return {"Partial Results": self.args.export_partial}
+
+    @staticmethod
+    def merge_partials(args) -> Dict[str, Any]:
+        """Merge the partial results files of all shards into the output of the specified task"""
+        partials = [PartialResults.load(path) for path in args.merge]
+        task_map = {
+            # the sequences were counted up to the maxk the shards were exported with
+            "2": lambda: {f"{partials[0]['maxk']}-Seq Counts": PartialResults.merge_sequence_counts(partials)},
+            "3": lambda: {"Name Mentions": PartialResults.merge_person_mentions(partials)},
+            "6": lambda: {"Pair Matches": PartialResults.merge_connections(partials, args.threshold)}
+        }
+
+        task_nums = TaskRunner._task_numbers(args)
+        for task_num in task_nums:
+            if task_num not in task_map:
+                raise ValueError(f"Task {task_num} can't be merged from partial results")
 
-        return {f"Question {task_num}": task_map[task_num]()}
+        return {f"Question {task_num}": task_map[task_num]() for task_num in task_nums}
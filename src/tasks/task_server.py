@@ -0,0 +1,129 @@
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any
+
+from ..text_analyzer.analyzer import TextAnalyzer
+from ..utils.files_utils import json_default
+
+
+class TaskServer:
+    """
+    Answers task queries over HTTP with a corpus that is loaded once.
+
+    Queries are JSON objects posted to /query, with a "task" number and the task arguments:
+        2: maxk                                    3: -
+        4: sequences (list of lists of words)      5: maxk
+        6: windowsize, threshold                   7: pairs, windowsize, threshold, maximal_distance
+        8: pairs, windowsize, threshold, fixed_length
+    Each query is answered on its own thread. Queries only read the corpus, and the intermediate
+    results they cache are computed in full before they are stored, or under a lock where they are
+    built in place like the sequence hashes, so queries can run concurrently.
+    """
+
+    # arguments each task's query must have
+    REQUIRED_ARGUMENTS = {
+        "2": ["maxk"], "3": [], "4": ["sequences"], "5": ["maxk"],
+        "6": ["windowsize", "threshold"],
+        "7": ["pairs", "windowsize", "threshold", "maximal_distance"],
+        "8": ["pairs", "windowsize", "threshold", "fixed_length"]
+    }
+
+    def __init__(self, analyzer: TextAnalyzer):
+        self.analyzer = analyzer
+
+    def answer(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a single query.
+
+        :param query: task number and task arguments
+        :return: the task result, in the same format as TaskRunner.run_task
+        """
+        task_map = {
+            "2": lambda: {f"{query['maxk']}-Seq Counts": self.analyzer.count_sequences(query["maxk"])},
+            "3": lambda: {"Name Mentions": self.analyzer.count_person_mentions()},
+            "4": lambda: {"K-Seq Matches": self.analyzer.search_sequences(query["sequences"])},
+            "5": lambda: {"Person Contexts and K-Seqs": self.analyzer.people_context(query["maxk"])},
+            "6": lambda: {"Pair Matches": self.analyzer.find_connections(query["windowsize"], query["threshold"])},
+            "7": lambda: {"Pair Matches": self.analyzer.indirect_connections(
+                pairs_to_check=[sorted(pair) for pair in query["pairs"]],
+                window_size=query["windowsize"],
+                threshold=query["threshold"],
+                maximal_distance=query["maximal_distance"]
+            )},
+            "8": lambda: {"Pair Matches": self.analyzer.fixed_length_paths(
+                pairs_to_check=[sorted(pair) for pair in query["pairs"]],
+                window_size=query["windowsize"],
+                threshold=query["threshold"],
+                maximal_distance=query["fixed_length"],
+                k=query["fixed_length"],
+                search_budget=query.get("search_budget")
+            )}
+        }
+
+        task_num = str(query.get("task"))
+        if task_num not in task_map:
+            raise ValueError(f"Invalid task number: {task_num}")
+        # checked up front, so a KeyError raised inside a task is reported as an internal error
+        for argument in self.REQUIRED_ARGUMENTS[task_num]:
+            if argument not in query:
+                raise ValueError(f"Missing argument for task {task_num}: {argument}")
+        return {f"Question {task_num}": task_map[task_num]()}
+
+    def create_server(self, host: str, port: int) -> ThreadingHTTPServer:
+        """
+        Bind an HTTP server answering queries, without serving them yet.
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free port
+        :return: the bound server, its address is in server_address
+        """
+        return ThreadingHTTPServer((host, port), self._handler())
+
+    def serve(self, host: str, port: int) -> None:
+        """
+        Serve queries until interrupted.
+
+        :param host: address to listen on
+        :param port: port to listen on
+        """
+        server = self.create_server(host, port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def _handler(self) -> type:
+        """Create a request handler class bound to this server."""
+        task_server = self
+
+        class QueryHandler(BaseHTTPRequestHandler):
+            """Handles a single HTTP request."""
+
+            def do_POST(self) -> None:
+                if self.path != '/query':
+                    self._respond(404, {"error": f"Unknown path: {self.path}"})
+                    return
+                try:
+                    query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    self._respond(200, task_server.answer(query))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._respond(400, {"error": str(e)})
+                except Exception as e:
+                    # any other failure is a bug, the client still gets a response instead of a closed connection
+                    self._respond(500, {"error": f"{type(e).__name__}: {e}"})
+
+            def _respond(self, status: int, body: Dict[str, Any]) -> None:
+                """write a JSON response."""
+                payload = json.dumps(body, default=json_default).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args) -> None:
+                """keep the server quiet, every query would be logged otherwise."""
+
+        return QueryHandler
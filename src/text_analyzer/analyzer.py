@@ -1,24 +1,41 @@
+import hashlib
 import json
-from typing import List, Dict, Optional, Tuple, Any
+import os
+from typing import List, Dict, Optional, Tuple, Any, Iterator, Iterable, Set
 
 import pandas as pd
 
-from .graph import GraphAnalyzer
+from .cooccurrence import CooccurrenceCounter
+from .corpus import Corpus, SentenceView
+from .counting import NGramCounter
+from .external_counting import ExternalNGramCounter
+from .graph import Graph
+from .heavy_hitters import HeavyHitterCounter
+from .index import NGramIndex
+from .matcher import NameMatcher
+from .ngram_hashing import NGramHasher
+from .parallel_context import ParallelContext
+from .partials import PartialResults
 from .processor import TextProcessor
-from ..utils.text_utils import flatten_list
+from .suffix_array import SuffixArrayIndex
 
 
 class TextAnalyzer:
     """Main Text Analyzer"""
 
+    # number of sentence rows read and processed at once
+    DEFAULT_CHUNK_SIZE = 100000
+
     def __init__(self,
                  path_to_sentences: Optional[str] = None,
                  path_to_persons: Optional[str] = None,
                  path_to_unwanted_words: Optional[str] = None,
                  sentences: Optional[List[List[str]]] = None,
-                 persons: Optional[List[List[List[str]]]] = None):
+                 persons: Optional[List[List[List[str]]]] = None,
+                 chunk_size: Optional[int] = None,
+                 corpus: Optional[Corpus] = None):
         self.processor = TextProcessor()
-        self.graph_analyzer = GraphAnalyzer()
+        self.chunk_size = chunk_size if chunk_size is not None else self.DEFAULT_CHUNK_SIZE
 
         # load unwanted words
         if path_to_unwanted_words is None:
@@ -27,18 +44,47 @@ class TextAnalyzer:
 
         # checks if we were given processed data or paths to unprocessed files
         paths_provided = path_to_sentences is not None or path_to_persons is not None
-        processed_data_provided = sentences is not None or persons is not None
+        processed_data_provided = sentences is not None or persons is not None or corpus is not None
         if paths_provided and processed_data_provided:
             raise ValueError("You must provide either paths or processed data, not both.")
+        if sentences is not None and corpus is not None:
+            raise ValueError("You must provide either sentences or a corpus, not both.")
 
         # load data
+        processed_sentences: Iterable[List[str]] = []
+        self.persons: List[List[List[str]]] = []
         if processed_data_provided:
-            self.sentences = sentences
-            self.persons = persons
+            processed_sentences = sentences if sentences is not None else []
+            self.persons = persons if persons is not None else []
         if paths_provided:
-            self.sentences = self._process_sentences(path_to_sentences)
+            processed_sentences = self._process_sentences(path_to_sentences)
             self.persons = self._process_persons(path_to_persons)
 
+        # sentences are kept as word ids, and only decoded back to words for results.
+        # sentences read from a file are interned chunk by chunk as they are streamed.
+        self.corpus = corpus if corpus is not None else Corpus.from_sentences(processed_sentences)
+        del processed_sentences
+
+        # shared inverted index, each sequence length is built once on first use
+        self.ngram_index = NGramIndex(self.corpus)
+        # groups equal sequences of each length with vectorized hashes, created on first use
+        self._ngram_hasher: Optional[NGramHasher] = None
+        # index used to search given sequences, replaced by a suffix array with use_suffix_array
+        self.sequence_index: Any = self.ngram_index
+        # all names and nicknames are matched together in a single pass on first use
+        self.name_matcher = NameMatcher(self.persons, self.corpus.vocabulary)
+        self._person_matches: Optional[Tuple[List[int], List[List[int]]]] = None
+        # shared windows of each pair, computed once per window size and reused for any threshold
+        self._pair_counts_by_window: Dict[int, Dict[Tuple[str, str], int]] = {}
+        # window sizes whose pair counts were read from a file instead of counted
+        self._loaded_pair_windows: Set[int] = set()
+        self._connection_graphs: Dict[Tuple[int, int], Graph] = {}
+
+    @property
+    def sentences(self) -> Corpus:
+        """Processed sentences, each one is decoded to a list of words on access"""
+        return self.corpus
+
     def _remove_unwanted_words(self, text: List[str]) -> List[str]:
         """
         Removes unwanted words from the given text.
@@ -47,24 +93,19 @@ class TextAnalyzer:
         """
         return [word for word in text if word not in self.unwanted_words]
 
-    def _process_sentences(self, path_to_sentences: Optional[str]) -> List[List[str]]:
+    def _process_sentences(self, path_to_sentences: Optional[str]) -> Iterator[List[str]]:
         """
         Preprocess each word using the basic preprocessing and parses as follows:
             1. Parsing the data as a list of sentences.
             2. Each sentence represented as a list of words.
         It also removes empty sentences.
+        The file is streamed in chunks of self.chunk_size rows, so the raw text is never fully loaded.
         """
         if path_to_sentences is None:
-            return []
+            return
 
-        sentences = pd.read_csv(path_to_sentences)
-        sentences = sentences[sentences.columns[0]]
-        sentences.fillna('', inplace=True)
-        sentences = sentences.apply(self.processor.process_string)  # basic preprocess
-        sentences = sentences.apply(str.split)  # split to list of words
-        sentences = sentences.apply(lambda x: self._remove_unwanted_words(x))  # remove unwanted words
-        sentences = sentences[sentences.apply(lambda x: x != [])]  # remove empty sentences
-        return sentences.to_list()
+        for chunk in self.processor.iter_sentence_chunks(path_to_sentences, self.unwanted_words, self.chunk_size):
+            yield from chunk
 
     def _process_persons(self, path_to_names: Optional[str]) -> List[List[List[str]]]:
         """
@@ -78,14 +119,23 @@ class TextAnalyzer:
         if path_to_names is None:
             return []
 
-        names = pd.read_csv(path_to_names, dtype=str)
-        names.fillna('', inplace=True)
+        return self._process_person_rows(pd.read_csv(path_to_names, dtype=str))
+
+    def _process_person_rows(self, names: pd.DataFrame) -> List[List[List[str]]]:
+        """
+        Preprocess persons table, the first column holds the main names
+        and the second holds comma separated additional names.
+        :param names: unprocessed persons
+        :return: processed persons without duplicates
+        """
+        names = names.fillna('')
         name_col, additional_names_col = names.columns[0], names.columns[1]
 
         # process Main Name
-        names[name_col] = names[name_col].apply(self.processor.process_string)  # basic preprocess
-        names[name_col] = names[name_col].apply(str.split)  # split to list of words
-        names[name_col] = names[name_col].apply(lambda x: self._remove_unwanted_words(x))  # remove unwanted words
+        names[name_col] = pd.Series(self.processor.split_and_filter(  # split + remove unwanted words
+            self.processor.process_strings(names[name_col]),  # basic preprocess
+            self.unwanted_words
+        ), index=names.index, dtype=object)
         # drop duplicates
         names['full_name'] = names[name_col].apply(lambda x: ' '.join(x))
         names.drop_duplicates(subset='full_name', keep="first", inplace=True)
@@ -93,74 +143,106 @@ class TextAnalyzer:
         # drop name with empty Main Name
         names.drop(names[names[name_col].apply(len) == 0].index)
 
-        # process additional names
-        names[additional_names_col] = names[additional_names_col].apply(
-            lambda x: [self._remove_unwanted_words(  # remove unwanted words
-                self.processor.process_string(name).split()  # basic preprocess + split to list of words
-            ) for name in x.split(',')]
-        )
+        # process additional names, the names of all the rows are processed together
+        rows_names = [names_text.split(',') for names_text in names[additional_names_col]]
+        processed_names = iter(self.processor.split_and_filter(  # split + remove unwanted words
+            self.processor.process_strings(pd.Series([name for row in rows_names for name in row], dtype=object)),
+            self.unwanted_words
+        ))
+        names[additional_names_col] = pd.Series([[next(processed_names) for _ in row] for row in rows_names],
+                                                index=names.index, dtype=object)
         names[additional_names_col] = names[additional_names_col].apply(  # remove empty nicknames
             lambda x: x if len(x[0]) > 0 else []
         )
 
         return names.values.tolist()
 
-    def _map_seq_by_len_to_sentences(self, seq_len: int) -> Dict[str, Dict[str, Any]]:
+    def _sentences_by_ids(self, sentence_ids: List[int]) -> SentenceView:
         """
-        Find all sequences of given length in text.
-        Find all the sentences each sequence appears in.
-        Count how many times the sequences appeared in the text.
+        Wrap sentence ids as the sentences of a result.
+        The sentences are only decoded when the result is read or serialized,
+        so results hold ids instead of copies of the sentences.
 
-        :param seq_len: length of sequences to find
-        :return: a dict mapping sequences to their occurrences and containing sentences
+        :param sentence_ids: ids of sentences in self.sentences
+        :return: view of the sorted distinct sentences
         """
-        results = {}
-        for sentence in self.sentences:
-            seqs_in_sentence = self.processor.get_sequences_from_sentence(sentence, seq_len)
-            for seq in seqs_in_sentence:
-                results[seq] = results.get(seq, {"sentences": set(), "count": 0})
-                results[seq]["sentences"].add(tuple(sentence))
-                results[seq]["count"] += 1
+        return SentenceView(self.corpus, sentence_ids)
 
-        for seq in results.keys():
-            results[seq]["sentences"] = sorted([list(s) for s in results[seq]["sentences"]])
-        return results
-
-    def count_sequences(self, seq_len: int) -> List[List[Any]]:
+    def count_sequences(self, seq_len: int, workers: int = 1, memory_budget: Optional[int] = None) -> List[List[Any]]:
         """
         Find all the sequences up to the given sequence length.
         Count how many times each sequence appeared in the text.
 
         :param seq_len: maximum length of the sequences to find and count
+        :param workers: number of processes to shard the sentences across, 1 counts with vectorized hashes
+        :param memory_budget: maximal number of distinct sequences to hold in memory, counts are spilled
+                              to temporary files and merged when it is reached. Not bounded if None.
         :return: list mapping sequences to their occurrence count
         """
-        results = []
-        for sequence_len in range(1, seq_len + 1):
-            seqs_to_sentences = self._map_seq_by_len_to_sentences(sequence_len)
-            results.append(
-                [f"{sequence_len}_seq",
-                 sorted([[seq, sentences["count"]] for seq, sentences in seqs_to_sentences.items()])]
-            )
-        return results
+        return list(self.iter_sequence_counts(seq_len, workers, memory_budget))
+
+    def iter_sequence_counts(self,
+                             seq_len: int,
+                             workers: int = 1,
+                             memory_budget: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        Generate the counts of count_sequences one length at a time,
+        so only the counts of a single length are decoded at once.
+
+        :param seq_len: maximum length of the sequences to find and count
+        :param workers: number of processes to shard the sentences across, 1 counts with vectorized hashes
+        :param memory_budget: maximal number of distinct sequences to hold in memory, not bounded if None
+        :return: generator of [f"{length}_seq", sorted [sequence, count] pairs]
+        """
+        if memory_budget is not None:
+            yield from ExternalNGramCounter(self.corpus, seq_len, memory_budget).iter_counts()
+            return
+        if workers <= 1:
+            for sequence_len in range(1, seq_len + 1):
+                yield [f"{sequence_len}_seq", self._hasher().counts(sequence_len)]
+            return
+
+        counters = NGramCounter.count(self.corpus, seq_len, workers)
+        for sequence_len, counter in enumerate(counters, start=1):
+            yield [f"{sequence_len}_seq",
+                   sorted([[self.ngram_index.decode(seq), count] for seq, count in counter.items()])]
+            counter.clear()
+
+    def top_sequences(self, seq_len: int, top_n: int, capacity: Optional[int] = None) -> List[List[Any]]:
+        """
+        Estimate the most frequent sequences of each length up to the given sequence length,
+        with a Space-Saving summary of bounded size for each length.
+
+        :param seq_len: maximum length of the sequences to count
+        :param top_n: number of sequences to return for each length
+        :param capacity: number of sequences each summary holds, larger is more accurate
+        :return: list mapping sequences to their estimated count and its maximal error
+        """
+        return HeavyHitterCounter.count(self.corpus, seq_len, top_n, capacity)
+
+    def _match_persons(self) -> Tuple[List[int], List[List[int]]]:
+        """
+        Find all persons in the text with a single pass of the name matcher.
+        The result is cached for the next tasks.
+
+        :return: mention count of each person and sorted ids of the sentences each person appears in
+        """
+        if self._person_matches is None:
+            self._person_matches = self.name_matcher.match(self.corpus)
+        return self._person_matches
 
     def count_person_mentions(self) -> List[List[Any]]:
         """
         Counts how many times each person appeared in the text.
+        Every word of the person's main name and nicknames is counted as a whole word.
         :return: list mapping person by their full name to their mention count
         """
-        text = ' '.join([' '.join(s) for s in self.sentences])
+        counts, _ = self._match_persons()
         name_counter = []
 
-        for person in self.persons:
-            full_name = ' '.join(person[0])
-            names_to_count = person[0] + [word for nickname in person[1] for word in nickname]
-            counter = 0
-
-            for name in set(names_to_count):
-                counter += text.count(name)
-
+        for person, counter in zip(self.persons, counts):
             if counter > 0:
-                name_counter.append([full_name, counter])
+                name_counter.append([' '.join(person[0]), counter])
 
         name_counter.sort(key=lambda x: x[0])
         return name_counter
@@ -168,23 +250,17 @@ class TextAnalyzer:
     def _search_sequences_in_text(self, words: List[List[str]]) -> List[List[Any]]:
         """
         For each word search for all the sentences it appears in.
-        We start by mapping all the words with relevant lengths to all the sentences they appear in.
-        Then we just search each sequence in the mapping so the search is made in O(1) time.
+        The shared n-gram index maps each relevant length once, so each search is made in O(1) time.
+        With a suffix array no map is built, and each search is a binary search over the suffixes.
 
         :param words: words to search
         :return: a list mapping sequences to sentences they appear in
         """
-        # Find unique sequence lengths
-        sequence_lens = {len(sequence) for sequence in words}
-
-        # Map sequences to sentences
-        mapping = {}
-        for seq_len in sequence_lens:
-            mapping.update(self._map_seq_by_len_to_sentences(seq_len))
-
-        # Make the search
-        results = [[' '.join(sequence), mapping[' '.join(sequence)]["sentences"]]
-                   for sequence in words if mapping.get(' '.join(sequence))]
+        results = []
+        for sequence in words:
+            sentence_ids = self.sequence_index.sentence_ids(sequence)
+            if sentence_ids:
+                results.append([' '.join(sequence), self._sentences_by_ids(sentence_ids)])
         results.sort(key=lambda x: x[0])
         return results
 
@@ -195,99 +271,307 @@ class TextAnalyzer:
         :param path_to_sequences: a path to a JSON file with words to find
         :return: a list mapping sequences to matching sentences
         """
-        # Process sequences file
         with open(path_to_sequences, 'r') as file:
             sequences: List[List[str]] = json.load(file)["keys"]
+        return self.search_sequences(sequences)
 
+    def search_sequences(self, sequences: List[List[str]]) -> List[List[Any]]:
+        """
+        For each unprocessed sequence, search for all the sentences it appears in.
+
+        :param sequences: sequences to find, each one is a list of words
+        :return: a list mapping sequences to matching sentences
+        """
         sequences = [self._remove_unwanted_words(self.processor.process_string(' '.join(seq)).split())
-                     for seq in sequences]  # process file
+                     for seq in sequences]  # process sequences
         drop_duplicates = set([tuple(seq) for seq in sequences if len(seq) > 0])
         sequences = [list(seq) for seq in drop_duplicates]
 
         return self._search_sequences_in_text(sequences)
 
-    def _map_names_to_sentences(self) -> Dict[str, List[List[str]]]:
+    def use_suffix_array(self, path: Optional[str] = None) -> None:
+        """
+        Search sequences with a suffix array over the whole text instead of per-length n-gram maps.
+        Sequences of any length are then found without building anything per length.
+
+        :param path: file to load the suffix array from, it is built and written there if
+                     the file doesn't exist or belongs to a different text. Not persisted if None.
+        """
+        fingerprint = self.corpus_fingerprint()
+        index = SuffixArrayIndex.load(path, self.corpus, fingerprint) if path is not None else None
+        if index is None:
+            index = SuffixArrayIndex(self.corpus)
+            if path is not None:
+                index.save(path, fingerprint)
+        self.sequence_index = index
+
+    def _map_names_to_sentence_ids(self) -> Dict[str, List[int]]:
+        """
+        Maps each person's name to the ids of the sentences where they appear.
+        :return: people mapped to sorted ids of sentences they appear in.
+        """
+        _, persons_sentence_ids = self._match_persons()
+        return {' '.join(person[0]): sentence_ids
+                for person, sentence_ids in zip(self.persons, persons_sentence_ids)
+                if len(sentence_ids) > 0}
+
+    def _map_names_to_sentences(self) -> Dict[str, SentenceView]:
         """
         Maps each person's name to sentences where they appear.
         :return: people mapped to sentences they appear in.
         """
-        names_to_sentences = {}
-
-        for person in self.persons:
-            names_to_find = [[name] for name in person[0]] + [[" ".join(person[0])]] + person[1]
-
-            sentences_with_name = self._search_sequences_in_text(names_to_find)
-            sentences_with_name = [sentences[1] for sentences in sentences_with_name]
-            sentences_with_name = set([tuple(sentence)
-                                       for sentences in sentences_with_name
-                                       for sentence in sentences])  # drop duplicate sentences
+        return {name: self._sentences_by_ids(sentence_ids)
+                for name, sentence_ids in self._map_names_to_sentence_ids().items()}
 
-            if len(sentences_with_name) > 0:
-                names_to_sentences[' '.join(person[0])] = [list(sentence) for sentence in sentences_with_name]
-
-        return names_to_sentences
-
-    def people_context(self, seq_len: int) -> List[List[Any]]:
+    def people_context(self, seq_len: int, workers: int = 1) -> List[List[Any]]:
         """
         For each person find all the sentences they appear in.
         For each sentence, search all the k-len sequences in the sentence.
 
         :param seq_len: maximum length of the sequences to find
+        :param workers: number of processes to split the persons across
         :return: a list mapping persons to sequences in their context
         """
-        names_to_sentences = self._map_names_to_sentences()
-        names_to_context = dict()
+        return list(self.iter_people_context(seq_len, workers))
 
-        for person, sentences in names_to_sentences.items():
-            seqs = []
-            for n in range(1, seq_len + 1):
-                seqs.append(flatten_list([self.processor.get_sequences_from_sentence(sentence, n)
-                                          for sentence in sentences]))
-            seqs = [seq.split() for seq in list(set(flatten_list(seqs)))]
-            seqs.sort()
-            names_to_context[person] = seqs
+    def iter_people_context(self, seq_len: int, workers: int = 1) -> Iterator[List[Any]]:
+        """
+        Generate the contexts of people_context one person at a time, in the order of their names.
 
-        names_to_context = [[k, v] for k, v in names_to_context.items()]
-        names_to_context.sort(key=lambda x: x[0])
-        return names_to_context
+        :param seq_len: maximum length of the sequences to find
+        :param workers: number of processes to split the persons across
+        :return: generator of [person, sorted sequences in their context]
+        """
+        hasher = self._hasher()
+        names_to_sentence_ids = self._map_names_to_sentence_ids()
+        names = sorted(names_to_sentence_ids)
+        if workers > 1:
+            contexts = ParallelContext.contexts(hasher, [names_to_sentence_ids[name] for name in names],
+                                                seq_len, workers)
+        else:
+            contexts = (hasher.context(names_to_sentence_ids[name], seq_len) for name in names)
+        for name, context in zip(names, contexts):
+            yield [name, context]
+
+    def _hasher(self) -> NGramHasher:
+        """
+        Get the sequence hasher of the current text, creating it on first use.
+        :return: the hasher
+        """
+        if self._ngram_hasher is None:
+            self._ngram_hasher = NGramHasher(self.corpus)
+        return self._ngram_hasher
 
     def find_connections(self, window_size: int, threshold: int) -> List[List[List[str]]]:
         """
         Find pairs of people who appear within distinct windows of sentences.
+        Windows are counted on sentence ids, so they are never materialized.
 
         :param window_size: Size of windows
         :param threshold: Minimum number of windows two people must appear together
         :return: List of pairs of connected persons
         """
-        persons_to_sentences = self._map_names_to_sentences()
-        connections = []
-        processed_pairs = set()
+        return sorted(sorted([person_a.split(), person_b.split()])
+                      for person_a, person_b in self._connected_pairs(window_size, threshold))
 
-        windows = [
-            self.sentences[i:i + window_size]
-            for i in range(len(self.sentences) - window_size + 1)
-        ]
+    def _pair_counts(self, window_size: int) -> Dict[Tuple[str, str], int]:
+        """
+        Count the windows each pair of persons appears together in.
+        The counts are computed once per window size and cached for the next queries.
 
-        for person_a, sentences_a in persons_to_sentences.items():
-            for person_b, sentences_b in persons_to_sentences.items():
-                if person_a >= person_b:  # Ensure each pair is processed only once
-                    continue
+        :param window_size: Size of windows
+        :return: pairs (sorted by name) mapped to the number of shared windows
+        """
+        if window_size not in self._pair_counts_by_window:
+            self._pair_counts_by_window[window_size] = CooccurrenceCounter.count_pairs(
+                self._map_names_to_sentence_ids(), window_size, len(self.corpus))
+        return self._pair_counts_by_window[window_size]
+
+    def _connected_pairs(self, window_size: int, threshold: int) -> List[Tuple[str, str]]:
+        """
+        Find the pairs of persons that appear together in at least threshold windows.
+
+        :param window_size: Size of windows
+        :param threshold: Minimum number of windows two people must appear together
+        :return: pairs of names, each pair sorted by name
+        """
+        if threshold > 0:
+            return [pair for pair, counter in self._pair_counts(window_size).items() if counter >= threshold]
+
+        # every pair passes, even if they never appear together
+        persons = sorted(self._map_names_to_sentence_ids().keys())
+        return [(person_a, person_b) for i, person_a in enumerate(persons) for person_b in persons[i + 1:]]
+
+    def connections_sweep(self, window_size: int, thresholds: List[int]) -> List[List[Any]]:
+        """
+        Find the connections for many thresholds from a single count of the shared windows.
+
+        :param window_size: Size of windows
+        :param thresholds: thresholds to check
+        :return: list of [threshold, number of connected pairs, connected pairs] sorted by threshold
+        """
+        results = []
+        for threshold in sorted(set(thresholds)):
+            connections = self.find_connections(window_size, threshold)
+            results.append([threshold, len(connections), connections])
+        return results
+
+    def counted_pair_windows(self) -> List[int]:
+        """
+        Window sizes whose pair counts were counted by this analyzer rather than loaded from a file.
+
+        :return: sorted window sizes
+        """
+        return sorted(set(self._pair_counts_by_window) - self._loaded_pair_windows)
+
+    def save_pair_counts(self, path: str, window_sizes: Optional[List[int]] = None) -> None:
+        """
+        Save the shared windows of each pair to a JSON file, so later runs can skip counting them.
+        Counts of other window sizes already in the file for the same text are kept.
+
+        :param path: path of the file to write
+        :param window_sizes: window sizes to save, all the counted ones if None
+        """
+        fingerprint = self.corpus_fingerprint()
+        pair_counts_by_window = {}
+        if os.path.exists(path):
+            file_fingerprint, file_pair_counts = CooccurrenceCounter.load(path)
+            if file_fingerprint == fingerprint:
+                pair_counts_by_window.update(file_pair_counts)
+        for window_size in (window_sizes if window_sizes is not None else self.counted_pair_windows()):
+            pair_counts_by_window[window_size] = self._pair_counts(window_size)
+        CooccurrenceCounter.dump(path, pair_counts_by_window, fingerprint)
+
+    def load_pair_counts(self, path: str) -> List[int]:
+        """
+        Load the shared windows of each pair from a JSON file written by save_pair_counts.
+        The file is ignored if it was computed for a different text or persons.
 
-                pair_key = (person_a, person_b)
-                if pair_key in processed_pairs:
-                    continue
-                processed_pairs.add(pair_key)
+        :param path: path of the file to read
+        :return: the loaded window sizes
+        """
+        fingerprint, pair_counts_by_window = CooccurrenceCounter.load(path)
+        if fingerprint != self.corpus_fingerprint():
+            return []
+        self._pair_counts_by_window.update(pair_counts_by_window)
+        self._loaded_pair_windows.update(pair_counts_by_window)
+        return sorted(pair_counts_by_window)
+
+    def append_sentences(self, sentences: List[str]) -> None:
+        """
+        Add new unprocessed sentences to the end of the text.
+        Only the new sentences are processed, and every index or count that was already
+        computed is updated in place: the n-gram postings, the person mentions and the
+        shared windows of pairs, where only the windows that touch the new sentences are counted.
+
+        :param sentences: unprocessed sentences
+        """
+        processed_sentences = self.processor.split_and_filter(
+            self.processor.process_strings(pd.Series(sentences, dtype=object)), self.unwanted_words)
+        processed_sentences = [sentence for sentence in processed_sentences if sentence]
+        if len(processed_sentences) == 0:
+            return
+
+        first_new = len(self.corpus)
+        vocabulary_size = len(self.corpus.vocabulary)
+        self.corpus.extend(processed_sentences)
+        self.ngram_index.extend(first_new)
+        self._ngram_hasher = None
+        if isinstance(self.sequence_index, SuffixArrayIndex):
+            # suffixes of the new sentences interleave with all the old ones, so it is built again
+            self.sequence_index = SuffixArrayIndex(self.corpus)
+        if len(self.corpus.vocabulary) > vocabulary_size:
+            # names with new words can now be found, they can only appear in the new sentences
+            self.name_matcher = NameMatcher(self.persons, self.corpus.vocabulary)
+
+        if self._person_matches is not None:
+            counts, persons_sentence_ids = self._person_matches
+            new_counts, new_sentence_ids = self.name_matcher.match(self.corpus, first_new)
+            self._person_matches = ([count + new_count for count, new_count in zip(counts, new_counts)],
+                                    [ids + new_ids for ids, new_ids in zip(persons_sentence_ids, new_sentence_ids)])
+
+        for window_size, pair_counts in self._pair_counts_by_window.items():
+            # windows from this sentence on include at least one new sentence
+            first_window = max(0, first_new - window_size + 1)
+            tail_sentence_ids = {name: [i - first_window for i in sentence_ids if i >= first_window]
+                                 for name, sentence_ids in self._map_names_to_sentence_ids().items()}
+            new_pair_counts = CooccurrenceCounter.count_pairs(
+                tail_sentence_ids, window_size, len(self.corpus) - first_window)
+            for pair, counter in new_pair_counts.items():
+                pair_counts[pair] = pair_counts.get(pair, 0) + counter
+        # loaded counts were updated to the new text, so they are saved again like counted ones
+        self._loaded_pair_windows.clear()
+        self._connection_graphs.clear()
+
+    def add_persons(self, persons: List[List[str]]) -> None:
+        """
+        Add new unprocessed persons.
+        Persons whose processed main name already exists are ignored. The new persons are
+        searched in the text on their own, and only their pairs are counted.
+
+        :param persons: unprocessed persons, each one is [main name, comma separated additional names]
+        """
+        if len(persons) == 0:
+            return
+
+        existing_names = {' '.join(person[0]) for person in self.persons}
+        new_persons = [person for person in self._process_person_rows(pd.DataFrame(persons, dtype=str))
+                       if ' '.join(person[0]) not in existing_names]
+        if len(new_persons) == 0:
+            return
+
+        self.persons = self.persons + new_persons
+        self.name_matcher = NameMatcher(self.persons, self.corpus.vocabulary)
+
+        if self._person_matches is not None:
+            counts, persons_sentence_ids = self._person_matches
+            new_counts, new_sentence_ids = NameMatcher(new_persons, self.corpus.vocabulary).match(self.corpus)
+            self._person_matches = (counts + new_counts, persons_sentence_ids + new_sentence_ids)
+
+        new_names = {' '.join(person[0]) for person in new_persons}
+        for window_size, pair_counts in self._pair_counts_by_window.items():
+            pair_counts.update(CooccurrenceCounter.count_pairs(
+                self._map_names_to_sentence_ids(), window_size, len(self.corpus), only_with=new_names))
+        self._loaded_pair_windows.clear()
+        self._connection_graphs.clear()
+
+    def export_partial(self,
+                       path: str,
+                       shard_index: int,
+                       maxk: Optional[int] = None,
+                       window_size: Optional[int] = None) -> None:
+        """
+        Export the aggregates of this text as one shard of a bigger corpus.
+        The files of all shards are combined with the PartialResults merge functions.
 
-                counter = 0
-                for window in windows:
-                    if any(sentence in window for sentence in sentences_a) and \
-                            any(sentence in window for sentence in sentences_b):
-                        counter += 1
-                # check the pair pass the threshold of windows they must be together in
-                if counter >= threshold:
-                    connections.append(sorted([person_a.split(), person_b.split()]))
+        :param path: path of the file to write
+        :param shard_index: position of this text among the shards of the corpus
+        :param maxk: maximal length of sequences to count, sequences are not counted if None
+        :param window_size: size of windows to count pairs in, pairs are not counted if None
+        """
+        mention_counts, persons_sentence_ids = self._match_persons()
+        partial = PartialResults.shard_partial(
+            persons=[' '.join(person[0]) for person in self.persons],
+            mention_counts=mention_counts,
+            persons_sentence_ids=persons_sentence_ids,
+            num_sentences=len(self.corpus),
+            shard_index=shard_index,
+            maxk=maxk,
+            sequence_counts=self.count_sequences(maxk) if maxk is not None else [],
+            window_size=window_size,
+            pair_counts=self._pair_counts(window_size) if window_size is not None else {}
+        )
+        PartialResults.dump(path, partial)
 
-        return sorted(connections)
+    def corpus_fingerprint(self) -> str:
+        """
+        Hash the processed sentences and persons.
+        :return: hex digest identifying the analyzed data
+        """
+        digest = hashlib.sha1(json.dumps([self.corpus.vocabulary.words, self.persons]).encode())
+        digest.update(self.corpus.tokens.tobytes())
+        digest.update(self.corpus.offsets.tobytes())
+        return digest.hexdigest()
 
     def names_to_person(self, names: List[str]) -> str:
         """
@@ -303,30 +587,20 @@ class TextAnalyzer:
                     actual_persons.append(' '.join(person[0]))
         return ' '.join(actual_persons)
 
-    def _all_indirect_connections(self,
-                                  pairs_to_check: List[List[str]],
-                                  window_size: int,
-                                  threshold: int,
-                                  maximal_distance: int) -> Dict[Tuple[str, str], List[List[str]]]:
+    def _connection_graph(self, window_size: int, threshold: int) -> Graph:
         """
-        Find all indirect connections between pairs of persons.
-        :param pairs_to_check: pairs to check.
+        Build the graph of connected persons.
+        The graph is built once per window size and threshold, so its components are reused.
+
         :param window_size: size of windows.
         :param threshold: number of windows two people must appear together.
-        :param maximal_distance: maximal distance between pairs.
-        :return:
-        """
-        graph = self.find_connections(window_size, threshold)
-        for pair in graph:
-            pair[0], pair[1] = ' '.join(pair[0]), ' '.join(pair[1])
-
-        results = {}
-        for start, end in pairs_to_check:
-            if start == '' or end == '':
-                results[(start, end)] = []
-                continue
-            results[(start, end)] = self.graph_analyzer.find_all_paths(graph, start, end, maximal_distance)
-        return results
+        :return: graph with an edge between every connected pair
+        """
+        if (window_size, threshold) not in self._connection_graphs:
+            self._connection_graphs[(window_size, threshold)] = Graph(
+                [[' '.join(person_a), ' '.join(person_b)]
+                 for person_a, person_b in self.find_connections(window_size, threshold)])
+        return self._connection_graphs[(window_size, threshold)]
 
     def indirect_connections(self,
                              pairs_to_check: List[List[str]],
@@ -342,12 +616,11 @@ class TextAnalyzer:
         :param maximal_distance: Maximum path length to consider
         :return: List of pairs with connection status
         """
-        res = self._all_indirect_connections(pairs_to_check, window_size, threshold, maximal_distance)
-        for pair in pairs_to_check:
-            if len(res.get(tuple(pair), [])) > 0:
-                pair.append(True)
-            else:
-                pair.append(False)
+        graph = self._connection_graph(window_size, threshold)
+        reachable = graph.batch_reachable([tuple(pair) for pair in pairs_to_check], maximal_distance)
+        for pair, is_reachable in zip(pairs_to_check, reachable):
+            start, end = pair
+            pair.append(start != '' and end != '' and is_reachable)
         return sorted(pairs_to_check, key=lambda x: x[0])
 
     def fixed_length_paths(self,
@@ -355,14 +628,29 @@ class TextAnalyzer:
                            window_size: int,
                            threshold: int,
                            maximal_distance: int,
-                           k: int) -> list[list[str or bool]]:
-        res = self._all_indirect_connections(pairs_to_check, window_size, threshold, maximal_distance)
-        for pair in pairs_to_check:
-            for path in res[tuple(pair)]:
-                if len(pair) > 2:
-                    continue
-                if len(path) >= k:
-                    pair.append(True)
-            if len(pair) == 2:
-                pair.append(False)
+                           k: int,
+                           search_budget: Optional[int] = None) -> list[list[str or Optional[bool]]]:
+        """
+        Find pairs of persons connected by a simple path of at least k and at most maximal_distance persons.
+
+        :param pairs_to_check: List of person pairs to check for connections
+        :param window_size: Size of sentence windows to consider
+        :param threshold: Minimum number of co-occurrences required
+        :param maximal_distance: Maximum path length to consider
+        :param k: Minimum path length to consider
+        :param search_budget: maximal number of search steps for each pair, unlimited if None
+        :return: List of pairs with connection status, None for pairs whose search ran out of budget
+        """
+        graph = self._connection_graph(window_size, threshold)
+        # pairs that are too far apart are rejected without searching their paths
+        distances = graph.batch_distances([tuple(pair) for pair in pairs_to_check], maximal_distance - 1)
+        searched = [i for i, (pair, distance) in enumerate(zip(pairs_to_check, distances))
+                    if pair[0] != '' and pair[1] != '' and distance is not None]
+        found = [False] * len(pairs_to_check)
+        searched_pairs = [tuple(pairs_to_check[i]) for i in searched]
+        for i, has_path in zip(searched, graph.batch_has_path_of_length(searched_pairs, k, maximal_distance,
+                                                                           search_budget)):
+            found[i] = has_path
+        for pair, has_path in zip(pairs_to_check, found):
+            pair.append(has_path)
         return pairs_to_check
@@ -0,0 +1,102 @@
+import json
+from typing import List, Dict, Tuple, Optional, Set
+
+
+class CooccurrenceCounter:
+    """Counts the sentence windows persons share without materializing the windows"""
+
+    @staticmethod
+    def window_intervals(sentence_ids: List[int],
+                         window_size: int,
+                         num_sentences: int) -> List[Tuple[int, int]]:
+        """
+        Find the windows containing at least one of the given sentences.
+        Window i contains sentences i to i + window_size - 1.
+
+        :param sentence_ids: sorted sentence ids
+        :param window_size: size of windows
+        :param num_sentences: number of sentences in the text
+        :return: sorted, disjoint and inclusive ranges of window ids
+        """
+        last_window = num_sentences - window_size
+        intervals: List[Tuple[int, int]] = []
+        for sentence_id in sentence_ids:
+            start, end = max(0, sentence_id - window_size + 1), min(sentence_id, last_window)
+            if start > end:
+                continue
+            if intervals and start <= intervals[-1][1] + 1:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+            else:
+                intervals.append((start, end))
+        return intervals
+
+    @classmethod
+    def count_pairs(cls,
+                    persons_to_sentence_ids: Dict[str, List[int]],
+                    window_size: int,
+                    num_sentences: int,
+                    only_with: Optional[Set[str]] = None) -> Dict[Tuple[str, str], int]:
+        """
+        Count the windows each pair of persons appears together in.
+        All window ranges are swept once by their start, and each range is only
+        compared with the ranges of other persons still open at that point.
+
+        :param persons_to_sentence_ids: persons mapped to the sorted ids of sentences they appear in
+        :param window_size: size of windows
+        :param num_sentences: number of sentences in the text
+        :param only_with: if given, only pairs with at least one of these persons are counted
+        :return: pairs (sorted by name) mapped to the number of shared windows, pairs that share none are omitted
+        """
+        if window_size <= 0:
+            return {}
+
+        events = sorted(
+            (start, end, person)
+            for person, sentence_ids in persons_to_sentence_ids.items()
+            for start, end in cls.window_intervals(sentence_ids, window_size, num_sentences)
+        )
+
+        pair_counts: Dict[Tuple[str, str], int] = {}
+        active: List[Tuple[int, str]] = []
+        for start, end, person in events:
+            active = [(active_end, other) for active_end, other in active if active_end >= start]
+            for active_end, other in active:
+                if only_with is not None and person not in only_with and other not in only_with:
+                    continue
+                pair = (person, other) if person < other else (other, person)
+                pair_counts[pair] = pair_counts.get(pair, 0) + min(end, active_end) - start + 1
+            active.append((end, person))
+        return pair_counts
+
+    @staticmethod
+    def dump(path: str, pair_counts_by_window: Dict[int, Dict[Tuple[str, str], int]], fingerprint: str) -> None:
+        """
+        Write pair counts of several window sizes to a JSON file.
+
+        :param path: path of the file to write
+        :param pair_counts_by_window: window size mapped to pairs mapped to the number of shared windows
+        :param fingerprint: identifier of the text the pairs were counted on
+        """
+        with open(path, 'w') as file:
+            json.dump({
+                "fingerprint": fingerprint,
+                "windows": {str(window_size): [[person_a, person_b, counter]
+                                               for (person_a, person_b), counter in pair_counts.items()]
+                            for window_size, pair_counts in pair_counts_by_window.items()}
+            }, file)
+
+    @staticmethod
+    def load(path: str) -> Tuple[str, Dict[int, Dict[Tuple[str, str], int]]]:
+        """
+        Read pair counts written by dump.
+
+        :param path: path of the file to read
+        :return: fingerprint, and window size mapped to pairs mapped to the number of shared windows
+        """
+        with open(path, 'r') as file:
+            data = json.load(file)
+        pair_counts_by_window = {
+            int(window_size): {(person_a, person_b): counter for person_a, person_b, counter in pairs}
+            for window_size, pairs in data["windows"].items()
+        }
+        return data["fingerprint"], pair_counts_by_window
@@ -0,0 +1,190 @@
+from array import array
+from typing import List, Dict, Optional, Iterator, Iterable, Tuple
+
+import numpy as np
+
+
+class Vocabulary:
+    """Interns words to integer ids"""
+
+    def __init__(self, words: Optional[List[str]] = None):
+        self.words: List[str] = []
+        self.word_ids: Dict[str, int] = {}
+        for word in words or []:
+            self.intern(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def intern(self, word: str) -> int:
+        """
+        Get the id of a word, adding it to the vocabulary if it is new.
+
+        :param word: word to intern
+        :return: word id
+        """
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = self.word_ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def encode(self, words: List[str]) -> Optional[Tuple[int, ...]]:
+        """
+        Convert words to their ids without adding new words.
+
+        :param words: list of words
+        :return: word ids, None if any of the words is not in the vocabulary
+        """
+        word_ids = []
+        for word in words:
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                return None
+            word_ids.append(word_id)
+        return tuple(word_ids)
+
+    def decode(self, word_ids: Iterable[int]) -> List[str]:
+        """
+        Convert word ids back to words.
+
+        :param word_ids: word ids
+        :return: list of words
+        """
+        return [self.words[word_id] for word_id in word_ids]
+
+
+class Corpus:
+    """
+    Sentences stored as one flat int32 array of word ids and an offsets array.
+    Sentence i is tokens[offsets[i]:offsets[i + 1]], and is decoded to words only on access.
+    """
+
+    def __init__(self,
+                 vocabulary: Optional[Vocabulary] = None,
+                 tokens: Optional[np.ndarray] = None,
+                 offsets: Optional[np.ndarray] = None):
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.tokens = tokens if tokens is not None else np.zeros(0, dtype=np.int32)
+        self.offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+
+    @classmethod
+    def from_sentences(cls, sentences: Iterable[List[str]], vocabulary: Optional[Vocabulary] = None) -> 'Corpus':
+        """
+        Intern sentences into a new corpus.
+        The sentences are consumed one by one into growing token and offset buffers,
+        so a stream of sentences is never held in memory as lists of words.
+
+        :param sentences: sentences as lists of words
+        :param vocabulary: vocabulary to intern the words with, a new one if None
+        :return: the corpus
+        """
+        vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        tokens = array('i')
+        offsets = array('q', [0])
+        for sentence in sentences:
+            tokens.extend(vocabulary.intern(word) for word in sentence)
+            offsets.append(len(tokens))
+        # the arrays are wrapped without copying them, so the tokens are only held once
+        return cls(vocabulary, np.frombuffer(tokens, dtype=np.int32), np.frombuffer(offsets, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def extend(self, sentences: Iterable[List[str]]) -> None:
+        """
+        Intern and append sentences to the end of the corpus.
+
+        :param sentences: sentences as lists of words
+        """
+        appended = Corpus.from_sentences(sentences, self.vocabulary)
+        self.tokens = np.concatenate([self.tokens, appended.tokens])
+        self.offsets = np.concatenate([self.offsets, appended.offsets[1:] + self.offsets[-1]])
+
+    def __getitem__(self, sentence_id: int) -> List[str]:
+        return self.vocabulary.decode(self.token_ids(sentence_id).tolist())
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for sentence_id in range(len(self)):
+            yield self[sentence_id]
+
+    def token_ids(self, sentence_id: int) -> np.ndarray:
+        """
+        Get the word ids of a sentence without decoding it.
+
+        :param sentence_id: sentence id
+        :return: int32 array of word ids
+        """
+        return self.tokens[self.offsets[sentence_id]:self.offsets[sentence_id + 1]]
+
+    def iter_token_ids(self, start: int = 0) -> Iterator[List[int]]:
+        """
+        Iterate the word ids of all sentences, in sentence id order.
+        :param start: id of the first sentence to iterate
+        :return: generator of word id lists
+        """
+        for sentence_id in range(start, len(self)):
+            yield self.token_ids(sentence_id).tolist()
+
+
+class SentenceView:
+    """
+    Sentences of a result, held as sentence ids and decoded only when the result is read or serialized.
+    Sentences with identical content are listed once, in sorted order, like a list of lists of words.
+    """
+
+    def __init__(self, corpus: Corpus, sentence_ids: List[int]):
+        self.corpus = corpus
+        self.sentence_ids = sentence_ids
+        # computed on first use, sentences are never changed once added to the corpus
+        self._distinct_ids: Optional[List[int]] = None
+        self._sorted_ids: Optional[List[int]] = None
+
+    def distinct_ids(self) -> List[int]:
+        """
+        Drop the ids of sentences whose content was already seen, without decoding them.
+        :return: one id for each distinct sentence
+        """
+        if self._distinct_ids is None:
+            self._distinct_ids = list({self.corpus.token_ids(i).tobytes(): i for i in self.sentence_ids}.values())
+        return self._distinct_ids
+
+    def sorted_ids(self) -> List[int]:
+        """
+        Order the distinct sentences by their words. The sentences are decoded for sorting once,
+        and only the sorted ids are kept.
+        :return: ids of the distinct sentences in sorted order
+        """
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self.distinct_ids(), key=self.corpus.__getitem__)
+        return self._sorted_ids
+
+    def materialize(self) -> List[List[str]]:
+        """
+        Decode the sentences.
+        :return: sorted list of distinct sentences
+        """
+        return [self.corpus[i] for i in self.sorted_ids()]
+
+    def __len__(self) -> int:
+        return len(self.distinct_ids())
+
+    def __iter__(self) -> Iterator[List[str]]:
+        return (self.corpus[i] for i in self.sorted_ids())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.corpus[i] for i in self.sorted_ids()[index]]
+        return self.corpus[self.sorted_ids()[index]]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SentenceView):
+            return self.materialize() == other.materialize()
+        if isinstance(other, list):
+            return self.materialize() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.materialize())
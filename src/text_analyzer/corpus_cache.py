@@ -0,0 +1,106 @@
+import json
+import os
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .corpus import Corpus, Vocabulary
+
+
+class CorpusCache:
+    """
+    Binary file holding a preprocessed corpus, so later runs skip reading and processing the CSV files.
+
+    Layout:
+        magic bytes, header length (uint64), JSON header,
+        token array (int32) and offsets array (int64), each aligned to 8 bytes.
+    The arrays are opened with mmap, so opening the file doesn't read them.
+    The header keeps the hash of the source files, so a stale cache is recognized.
+    """
+
+    MAGIC = b'TXTCORP\0'
+    VERSION = 3
+    ALIGNMENT = 8
+
+    @classmethod
+    def save(cls,
+             path: str,
+             corpus: Corpus,
+             persons: List[List[List[str]]],
+             source_hash: str) -> None:
+        """
+        Write a corpus to a cache file.
+
+        :param path: path of the file to write
+        :param corpus: interned sentences
+        :param persons: processed persons
+        :param source_hash: hash of the files the corpus was processed from
+        """
+        header = json.dumps({
+            "version": cls.VERSION,
+            "source_hash": source_hash,
+            "num_tokens": len(corpus.tokens),
+            "num_sentences": len(corpus),
+            "vocabulary": corpus.vocabulary.words,
+            "persons": persons
+        }).encode()
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(cls.MAGIC)
+            file.write(struct.pack('<Q', len(header)))
+            file.write(header)
+            for array in (corpus.tokens.astype('<i4', copy=False), corpus.offsets.astype('<i8', copy=False)):
+                file.write(b'\0' * (-file.tell() % cls.ALIGNMENT))
+                file.write(array.tobytes())
+        os.replace(tmp_path, path)  # readers never see a partially written cache
+
+    @classmethod
+    def load(cls,
+             path: str,
+             source_hash: Optional[str] = None) -> Optional[Tuple[Corpus, List[List[List[str]]]]]:
+        """
+        Open a cache file, with its arrays memory mapped.
+
+        :param path: path of the file to read
+        :param source_hash: expected hash of the source files, not checked if None
+        :return: the corpus and persons, None if there is no cache or it is stale
+        """
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                return None
+            header_len, = struct.unpack('<Q', file.read(8))
+            header = json.loads(file.read(header_len))
+            data_start = file.tell()
+
+        if header["version"] != cls.VERSION:
+            return None
+        if source_hash is not None and header["source_hash"] != source_hash:
+            return None
+
+        tokens_start = data_start + (-data_start % cls.ALIGNMENT)
+        tokens = cls._map_array(path, '<i4', tokens_start, header["num_tokens"])
+        offsets_start = tokens_start + tokens.nbytes
+        offsets_start += -offsets_start % cls.ALIGNMENT
+        offsets = cls._map_array(path, '<i8', offsets_start, header["num_sentences"] + 1)
+
+        return Corpus(Vocabulary(header["vocabulary"]), tokens, offsets), header["persons"]
+
+    @staticmethod
+    def _map_array(path: str, dtype: str, offset: int, length: int) -> np.ndarray:
+        """
+        Memory map an array of a file as read only.
+
+        :param path: path of the file
+        :param dtype: type of the array items
+        :param offset: position of the array in the file
+        :param length: number of items
+        :return: the mapped array
+        """
+        if length == 0:  # empty arrays can't be mapped
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(length,))
@@ -0,0 +1,88 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Iterable
+
+import numpy as np
+
+from .corpus import Corpus
+
+
+class NGramCounter:
+    """Counts sequences of all lengths up to a maximum, optionally over shards in a process pool"""
+
+    # number of shards given to each worker, so slow shards don't hold back the whole pool
+    SHARDS_PER_WORKER = 4
+
+    @staticmethod
+    def count_shard(tokens: np.ndarray, offsets: np.ndarray, max_len: int) -> List[Counter]:
+        """
+        Count all sequences of lengths 1 to max_len in a shard with a single pass over its sentences.
+
+        :param tokens: word ids of the shard
+        :param offsets: start of each sentence in tokens, and the end of the last one
+        :param max_len: maximal length of sequences
+        :return: counter of word id sequences for each length, index 0 for length 1
+        """
+        counters = [Counter() for _ in range(max_len)]
+        word_ids = tokens.tolist()
+        bounds = offsets.tolist()
+        for start, end in zip(bounds, bounds[1:]):
+            for seq_len, counter in enumerate(counters, start=1):
+                counter.update(tuple(word_ids[i:i + seq_len]) for i in range(start, end - seq_len + 1))
+        return counters
+
+    @staticmethod
+    def merge(partial_counts: Iterable[List[Counter]], max_len: int) -> List[Counter]:
+        """
+        Merge the counters of many shards.
+
+        :param partial_counts: counters of each shard, one counter for each length
+        :param max_len: maximal length of sequences
+        :return: merged counter for each length
+        """
+        merged = [Counter() for _ in range(max_len)]
+        for counters in partial_counts:
+            for total, counter in zip(merged, counters):
+                total.update(counter)
+        return merged
+
+    @staticmethod
+    def shard_bounds(corpus: Corpus, num_shards: int) -> List[Tuple[int, int]]:
+        """
+        Split the sentences to shards with about the same number of words.
+
+        :param corpus: interned sentences
+        :param num_shards: number of shards to split to
+        :return: (first sentence id, last sentence id + 1) of each non-empty shard
+        """
+        targets = np.linspace(0, corpus.offsets[-1], num_shards + 1)
+        cuts = np.unique(np.searchsorted(corpus.offsets, targets).clip(0, len(corpus)))
+        cuts[0], cuts[-1] = 0, len(corpus)
+        return [(int(start), int(end)) for start, end in zip(cuts, cuts[1:]) if end > start]
+
+    @classmethod
+    def count(cls, corpus: Corpus, max_len: int, workers: int = 1) -> List[Counter]:
+        """
+        Count all sequences of lengths 1 to max_len in the corpus.
+        With more than one worker, the sentences are sharded across a process pool
+        and the partial counts of the shards are merged.
+
+        :param corpus: interned sentences
+        :param max_len: maximal length of sequences
+        :param workers: number of worker processes
+        :return: counter of word id sequences for each length, index 0 for length 1
+        """
+        if workers <= 1 or len(corpus) == 0:
+            return cls.count_shard(corpus.tokens, corpus.offsets, max_len)
+
+        shards = []
+        for start, end in cls.shard_bounds(corpus, workers * cls.SHARDS_PER_WORKER):
+            first_token, last_token = corpus.offsets[start], corpus.offsets[end]
+            shards.append((corpus.tokens[first_token:last_token], corpus.offsets[start:end + 1] - first_token))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partial_counts = executor.map(cls.count_shard,
+                                          [tokens for tokens, _ in shards],
+                                          [offsets for _, offsets in shards],
+                                          [max_len] * len(shards))
+            return cls.merge(partial_counts, max_len)
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+import os
+import tempfile
+from collections import Counter
+from typing import List, Any, Iterator, Tuple
+
+from .corpus import Corpus
+
+
+class ExternalNGramCounter:
+    """
+    Counts sequences of all lengths up to a maximum with a bounded number of sequences in memory.
+
+    Sentences are counted into an in-memory counter until it holds memory_budget distinct sequences.
+    The counter is then spilled to a temporary run file sorted by (length, text), and cleared.
+    The runs are combined with a k-way merge that adds up the counts of equal sequences,
+    which gives the exact counts already in the sorted order of the task output.
+    """
+
+    def __init__(self, corpus: Corpus, max_len: int, memory_budget: int):
+        if memory_budget <= 0:
+            raise ValueError("Memory budget must be positive.")
+        self.corpus = corpus
+        self.max_len = max_len
+        self.memory_budget = memory_budget
+
+    def count(self) -> List[List[Any]]:
+        """
+        Count all sequences of lengths 1 to max_len in the corpus.
+
+        :return: for each length, [f"{length}_seq", sorted [sequence text, count] pairs]
+        """
+        return list(self.iter_counts())
+
+    def iter_counts(self) -> Iterator[List[Any]]:
+        """
+        Generate the counts of count one length at a time, while the runs are merged.
+
+        :return: generator of [f"{length}_seq", sorted [sequence text, count] pairs]
+        """
+        with tempfile.TemporaryDirectory(prefix='ngram_runs_') as run_dir:
+            merged = self._merge_runs(self._spill_runs(run_dir))
+            next_len = 1
+            for seq_len, entries in itertools.groupby(merged, key=lambda entry: entry[0]):
+                for missing_len in range(next_len, seq_len):  # lengths no sentence is long enough for
+                    yield [f"{missing_len}_seq", []]
+                yield [f"{seq_len}_seq", [[text, count] for _, text, count in entries]]
+                next_len = seq_len + 1
+            for missing_len in range(next_len, self.max_len + 1):
+                yield [f"{missing_len}_seq", []]
+
+    def _spill_runs(self, run_dir: str) -> List[str]:
+        """
+        Count the sentences, spilling the counter to a new run file whenever it is full.
+
+        :param run_dir: directory to write the run files to
+        :return: paths of the run files
+        """
+        run_paths = []
+        counter = Counter()
+        for word_ids in self.corpus.iter_token_ids():
+            for seq_len in range(1, self.max_len + 1):
+                counter.update(tuple(word_ids[i:i + seq_len]) for i in range(len(word_ids) - seq_len + 1))
+            if len(counter) >= self.memory_budget:
+                run_paths.append(self._write_run(run_dir, len(run_paths), counter))
+                counter.clear()
+        if counter:
+            run_paths.append(self._write_run(run_dir, len(run_paths), counter))
+        return run_paths
+
+    def _write_run(self, run_dir: str, run_index: int, counter: Counter) -> str:
+        """
+        Write a counter to a run file, sorted by sequence length and then by text.
+        Each line is "length<TAB>text<TAB>count". Words never contain whitespace, so the fields are unambiguous.
+
+        :param run_dir: directory to write the run file to
+        :param run_index: number of the run
+        :param counter: counts of word id sequences
+        :return: path of the run file
+        """
+        decode = self.corpus.vocabulary.decode
+        entries = sorted((len(seq), ' '.join(decode(seq)), count) for seq, count in counter.items())
+        path = os.path.join(run_dir, f"run_{run_index}.tsv")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(f"{seq_len}\t{text}\t{count}\n" for seq_len, text, count in entries)
+        return path
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[int, str, int]]:
+        """
+        Stream the entries of a run file.
+
+        :param path: path of the run file
+        :return: generator of (length, text, count)
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                seq_len, text, count = line.rstrip('\n').split('\t')
+                yield int(seq_len), text, int(count)
+
+    @classmethod
+    def _merge_runs(cls, run_paths: List[str]) -> Iterator[Tuple[int, str, int]]:
+        """
+        Merge sorted run files, adding up the counts of the same sequence.
+
+        :param run_paths: paths of the run files
+        :return: generator of (length, text, total count), sorted by length and text
+        """
+        merged = heapq.merge(*(cls._read_run(path) for path in run_paths), key=lambda entry: entry[:2])
+        current = None
+        for seq_len, text, count in merged:
+            if current is not None and current[0] == seq_len and current[1] == text:
+                current[2] += count
+                continue
+            if current is not None:
+                yield tuple(current)
+            current = [seq_len, text, count]
+        if current is not None:
+            yield tuple(current)
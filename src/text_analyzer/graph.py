@@ -1,53 +1,354 @@
-from typing import List, Set
+from collections import deque
+from typing import List, Dict, Set, Optional, Iterator, Tuple
 
 
-class GraphAnalyzer:
-    """Handles graph operations for finding paths"""
+class Graph:
+    """Undirected graph with interned node ids and adjacency lists"""
 
-    @staticmethod
-    def find_all_paths(graph: List[List[str]],
-                       start: str,
-                       end: str,
-                       max_len: int) -> List[List[str]]:
+    # maximal total number of path nodes in the fully searched states remembered by a fixed length path search
+    MAX_SEARCHED_NODES = 1000000
+
+    def __init__(self, edges: List[List[str]]):
+        self.node_ids: Dict[str, int] = {}
+        self.nodes: List[str] = []
+        self.adjacency: List[List[int]] = []
+        self._components: Optional[List[int]] = None
+        self._component_sizes: Dict[int, int] = {}
+
+        seen_edges: Set[tuple] = set()
+        for node_a, node_b in edges:
+            id_a, id_b = self._intern(node_a), self._intern(node_b)
+            edge = (min(id_a, id_b), max(id_a, id_b))
+            if edge in seen_edges:
+                continue
+            seen_edges.add(edge)
+            # neighbors keep the order of the edge list
+            self.adjacency[id_a].append(id_b)
+            self.adjacency[id_b].append(id_a)
+
+    def _intern(self, node: str) -> int:
+        """
+        Get the id of a node, adding it to the graph if it is new.
+
+        :param node: node name
+        :return: node id
+        """
+        if node not in self.node_ids:
+            self.node_ids[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.adjacency.append([])
+        return self.node_ids[node]
+
+    def node_id(self, node: str) -> Optional[int]:
+        """
+        Get the id of a node.
+
+        :param node: node name
+        :return: node id, None if the node has no edges
+        """
+        return self.node_ids.get(node)
+
+    def neighbors(self, node: str) -> List[str]:
+        """
+        Find all neighbors of a given node in the graph.
+
+        :param node: node name
+        :return: names of neighbors
+        """
+        node_id = self.node_id(node)
+        if node_id is None:
+            return []
+        return [self.nodes[neighbor] for neighbor in self.adjacency[node_id]]
+
+    def components(self) -> List[int]:
+        """
+        Find the connected component of every node with union-find.
+        The components are computed on the first call and cached.
+
+        :return: component representative of each node id
+        """
+        if self._components is None:
+            parents = list(range(len(self.nodes)))
+
+            def find(node: int) -> int:
+                """find the root of a node, compressing the path on the way."""
+                root = node
+                while parents[root] != root:
+                    root = parents[root]
+                while parents[node] != root:
+                    parents[node], node = root, parents[node]
+                return root
+
+            for node, neighbors in enumerate(self.adjacency):
+                for neighbor in neighbors:
+                    root_a, root_b = find(node), find(neighbor)
+                    if root_a != root_b:
+                        parents[root_b] = root_a
+            components = [find(node) for node in range(len(self.nodes))]
+            component_sizes: Dict[int, int] = {}
+            for root in components:
+                component_sizes[root] = component_sizes.get(root, 0) + 1
+            # the sizes are published first, a concurrent caller seeing the components can read them
+            self._component_sizes = component_sizes
+            self._components = components
+        return self._components
+
+    def component_size(self, node_id: int) -> int:
+        """
+        Get the number of nodes in the connected component of a node.
+
+        :param node_id: node id
+        :return: size of the component
+        """
+        return self._component_sizes[self.components()[node_id]]
+
+    def same_component(self, node_a: str, node_b: str) -> bool:
+        """
+        Check in O(1) if two nodes are connected at all.
+
+        :param node_a: node name
+        :param node_b: node name
+        :return: True if there is a path between the nodes
+        """
+        if node_a == node_b:
+            return True
+        id_a, id_b = self.node_id(node_a), self.node_id(node_b)
+        if id_a is None or id_b is None:
+            return False
+        components = self.components()
+        return components[id_a] == components[id_b]
+
+    def batch_distances(self, pairs: List[Tuple[str, str]], max_edges: int) -> List[Optional[int]]:
+        """
+        Find the distance of many pairs of nodes.
+        Pairs in different components are rejected without a search, and all the pairs
+        sharing a start node are answered by a single bounded BFS from it.
+
+        :param pairs: pairs of node names
+        :param max_edges: maximal distance to search for, in edges
+        :return: distance of each pair in edges, None if it is larger than max_edges
+        """
+        distances: List[Optional[int]] = [None] * len(pairs)
+        targets_by_start: Dict[int, Dict[int, List[int]]] = {}
+        for pair_index, (start, end) in enumerate(pairs):
+            if start == end:
+                distances[pair_index] = 0 if max_edges >= 0 else None
+            elif self.same_component(start, end):
+                targets = targets_by_start.setdefault(self.node_ids[start], {})
+                targets.setdefault(self.node_ids[end], []).append(pair_index)
+
+        for start_id, targets in targets_by_start.items():
+            remaining = len(targets)
+            depth = {start_id: 0}
+            queue = deque([start_id])
+            while queue and remaining:
+                node = queue.popleft()
+                if depth[node] >= max_edges:
+                    break
+                for neighbor in self.adjacency[node]:
+                    if neighbor in depth:
+                        continue
+                    depth[neighbor] = depth[node] + 1
+                    queue.append(neighbor)
+                    if neighbor in targets:
+                        for pair_index in targets[neighbor]:
+                            distances[pair_index] = depth[neighbor]
+                        remaining -= 1
+        return distances
+
+    def _bfs_depths(self, source: int, max_edges: int) -> Dict[int, int]:
+        """
+        Find the distance of every node up to max_edges from a source node.
+
+        :param source: source node id
+        :param max_edges: maximal distance to search for, in edges
+        :return: node ids mapped to their distance from the source
+        """
+        depth = {source: 0}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if depth[node] >= max_edges:
+                break
+            for neighbor in self.adjacency[node]:
+                if neighbor not in depth:
+                    depth[neighbor] = depth[node] + 1
+                    queue.append(neighbor)
+        return depth
+
+    def has_path_of_length(self,
+                           start: str,
+                           end: str,
+                           min_len: int,
+                           max_len: int,
+                           search_budget: Optional[int] = None) -> Optional[bool]:
+        """
+        Check if there is a simple path between two nodes with min_len to max_len nodes.
+
+        :param start: Starting node name.
+        :param end: Destination node name.
+        :param min_len: Minimum allowed length of a path, in nodes.
+        :param max_len: Maximum allowed length of a path, in nodes.
+        :param search_budget: maximal number of DFS steps, unlimited if None
+        :return: True if such a path was found, False if there is none,
+                 None if the search budget ran out before the answer was known
+        """
+        return self.batch_has_path_of_length([(start, end)], min_len, max_len, search_budget)[0]
+
+    def batch_has_path_of_length(self,
+                                 pairs: List[Tuple[str, str]],
+                                 min_len: int,
+                                 max_len: int,
+                                 search_budget: Optional[int] = None) -> List[Optional[bool]]:
+        """
+        Check for many pairs of nodes if there is a simple path with min_len to max_len nodes between them.
+        The BFS distances to each end node are computed once for all the pairs sharing it.
+
+        :param pairs: pairs of node names
+        :param min_len: Minimum allowed length of a path, in nodes.
+        :param max_len: Maximum allowed length of a path, in nodes.
+        :param search_budget: maximal number of DFS steps for each pair, unlimited if None
+        :return: for each pair, True if such a path was found, False if there is none,
+                 None if the search budget ran out before the answer was known
+        """
+        distances_by_end: Dict[int, Dict[int, int]] = {}
+        results: List[Optional[bool]] = []
+        for start, end in pairs:
+            if start == end:
+                results.append(min_len <= 1 <= max_len)
+                continue
+            if max_len < 2 or not self.same_component(start, end):
+                results.append(False)
+                continue
+
+            start_id, end_id = self.node_ids[start], self.node_ids[end]
+            if min(max_len, self.component_size(start_id)) < min_len:
+                results.append(False)
+                continue
+            if end_id not in distances_by_end:
+                distances_by_end[end_id] = self._bfs_depths(end_id, max_len - 1)
+            results.append(self._search_path(start_id, end_id, min_len, max_len,
+                                             distances_by_end[end_id], search_budget))
+        return results
+
+    def _search_path(self,
+                     start_id: int,
+                     end_id: int,
+                     min_len: int,
+                     max_len: int,
+                     distances_to_end: Dict[int, int],
+                     search_budget: Optional[int]) -> Optional[bool]:
+        """
+        Search for a simple path with min_len to max_len nodes with a DFS that stops at the first such path.
+        Branches that cannot reach the end within max_len by their BFS distance are pruned, and
+        (node, nodes before it on the path) states that were already fully searched are not searched again.
+        States hold at most max_len nodes whatever the node ids are, and the memo keeps states with at most
+        MAX_SEARCHED_NODES nodes in total, so it stays bounded on large components.
+
+        :param start_id: Starting node id.
+        :param end_id: Destination node id.
+        :param min_len: Minimum allowed length of a path, in nodes.
+        :param max_len: Maximum allowed length of a path, in nodes.
+        :param distances_to_end: BFS distance to the end of every node up to max_len - 1 edges away
+        :param search_budget: maximal number of DFS steps, unlimited if None
+        :return: True if such a path was found, False if there is none,
+                 None if the search budget ran out before the answer was known
+        """
+        if start_id not in distances_to_end:
+            return False
+
+        searched_states = set()
+        searched_nodes = 0
+        steps = 0
+        path = [start_id]
+        on_path = {start_id}
+        # nodes of the path up to each level, shared by the states of all the children of that level
+        path_sets = [frozenset(on_path)]
+        stack = [iter(self.adjacency[start_id])]
+        while stack:
+            advanced = False
+            for neighbor in stack[-1]:
+                if neighbor in on_path:
+                    continue
+                length = len(path) + 1
+                if neighbor == end_id:
+                    if min_len <= length <= max_len:
+                        return True
+                    continue
+                distance = distances_to_end.get(neighbor)
+                if distance is None or length + distance > max_len:
+                    continue
+                if (neighbor, path_sets[-1]) in searched_states:
+                    continue
+
+                steps += 1
+                if search_budget is not None and steps > search_budget:
+                    return None
+                path.append(neighbor)
+                on_path.add(neighbor)
+                path_sets.append(path_sets[-1] | {neighbor})
+                stack.append(iter(self.adjacency[neighbor]))
+                advanced = True
+                break
+
+            if not advanced:
+                stack.pop()
+                path_sets.pop()
+                node = path.pop()
+                on_path.discard(node)
+                if path and searched_nodes + len(path) <= self.MAX_SEARCHED_NODES:
+                    searched_states.add((node, path_sets[-1]))
+                    searched_nodes += len(path)
+        return False
+
+    def batch_reachable(self, pairs: List[Tuple[str, str]], max_len: int) -> List[bool]:
         """
-        Find all paths between two nodes in an undirected graph with maximum length.
+        Check for many pairs of nodes if there is a path with at most max_len nodes between them.
+
+        :param pairs: pairs of node names
+        :param max_len: Maximum allowed length of a path, in nodes.
+        :return: True for each pair that has such a path
+        """
+        return [distance is not None for distance in self.batch_distances(pairs, max_len - 1)]
+
+    def iter_paths(self, start: str, end: str, max_len: int) -> Iterator[List[str]]:
+        """
+        Lazily enumerate all simple paths between two nodes with at most max_len nodes.
+        Paths are generated in DFS order with an explicit stack.
 
-        :param graph: List of edges where each edge is a list of two node names.
         :param start: Starting node name.
         :param end: Destination node name.
-        :param max_len: Maximum allowed length of a path.
-        :return: List of all possible paths from start to end
-        """
-
-        def get_neighbors(node: str) -> List[str]:
-            """Find all neighbors of a given node in the graph."""
-            neighbors = []
-            for edge in graph:
-                if edge[0] == node:
-                    neighbors.append(edge[1])
-                elif edge[1] == node:
-                    neighbors.append(edge[0])
-            return neighbors
-
-        def dfs(current: str, path: List[str], paths: List[List[str]], visited: Set[str]) -> None:
-            """recursive function for dfs."""
-            if len(path) > max_len:
-                return
-
-            if current == end:
-                paths.append(path[:])
-                return
-
-            for neighbor in get_neighbors(current):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    # find all paths from this node
-                    dfs(neighbor, path + [neighbor], paths, visited)
-                    # because we want all paths and not just one
-                    visited.remove(neighbor)
-
-        paths: List[List[str]] = []
-        visited: Set[str] = {start}
-        dfs(start, [start], paths, visited)
-
-        return paths
+        :param max_len: Maximum allowed length of a path, in nodes.
+        :return: generator of paths, each path is a list of node names
+        """
+        if max_len < 1:
+            return
+        if start == end:
+            yield [start]
+            return
+
+        start_id, end_id = self.node_id(start), self.node_id(end)
+        if start_id is None or end_id is None:
+            return
+
+        path = [start_id]
+        on_path = {start_id}
+        stack = [iter(self.adjacency[start_id])]
+        while stack:
+            advanced = False
+            if len(path) < max_len:
+                for neighbor in stack[-1]:
+                    if neighbor in on_path:
+                        continue
+                    if neighbor == end_id:
+                        yield [self.nodes[node] for node in path] + [end]
+                        continue
+                    path.append(neighbor)
+                    on_path.add(neighbor)
+                    stack.append(iter(self.adjacency[neighbor]))
+                    advanced = True
+                    break
+
+            if not advanced:
+                stack.pop()
+                on_path.discard(path.pop())
@@ -0,0 +1,103 @@
+import heapq
+from typing import List, Dict, Any, Hashable, Tuple, Optional
+
+from .corpus import Corpus
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the most frequent items of a stream, holding at most capacity items.
+
+    When a new item arrives and the summary is full, the item with the smallest count is replaced,
+    and the new item inherits that count as its error. Every estimated count is at least the
+    true count, and at most error above it. Any item seen more than stream length / capacity
+    times is guaranteed to be in the summary.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # min-heap of (count, item). Counts only grow, so entries with an outdated count are skipped lazily
+        self._heap: List[Tuple[int, Hashable]] = []
+        self.stream_length = 0
+
+    def add(self, item: Hashable) -> None:
+        """
+        Count one occurrence of an item.
+
+        :param item: the item
+        """
+        self.stream_length += 1
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+        else:
+            min_count, min_item = self._pop_min()
+            del self.counts[min_item], self.errors[min_item]
+            self.counts[item] = min_count + 1
+            self.errors[item] = min_count
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        """
+        Remove the entry of the item with the smallest count from the heap.
+
+        :return: (count, item) of the item
+        """
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Get the items with the highest estimated counts.
+
+        :param n: number of items
+        :return: (item, estimated count, error) sorted by descending count,
+                 the true count of each item is between estimated count - error and estimated count
+        """
+        return [(item, count, self.errors[item])
+                for item, count in heapq.nlargest(n, self.counts.items(), key=lambda entry: entry[1])]
+
+
+class HeavyHitterCounter:
+    """Finds the most frequent sequences of each length in one streaming pass with bounded memory"""
+
+    # summary capacity for each requested top sequence when no capacity is given
+    DEFAULT_CAPACITY_FACTOR = 10
+
+    @classmethod
+    def count(cls, corpus: Corpus, max_len: int, top_n: int, capacity: Optional[int] = None) -> List[List[Any]]:
+        """
+        Estimate the top sequences of lengths 1 to max_len.
+
+        :param corpus: interned sentences
+        :param max_len: maximal length of sequences
+        :param top_n: number of sequences to return for each length
+        :param capacity: number of sequences each length's summary holds, top_n * 10 if None
+        :return: for each length, [f"{length}_seq", [sequence, estimated count, error] sorted by
+                 descending count and then by sequence]
+        """
+        capacity = capacity if capacity is not None else top_n * cls.DEFAULT_CAPACITY_FACTOR
+        summaries = [SpaceSaving(max(capacity, top_n)) for _ in range(max_len)]
+        for word_ids in corpus.iter_token_ids():
+            for seq_len, summary in enumerate(summaries, start=1):
+                for i in range(len(word_ids) - seq_len + 1):
+                    summary.add(tuple(word_ids[i:i + seq_len]))
+
+        results = []
+        for seq_len, summary in enumerate(summaries, start=1):
+            top = [[' '.join(corpus.vocabulary.decode(seq)), count, error]
+                   for seq, count, error in summary.top(top_n)]
+            top.sort(key=lambda entry: (-entry[1], entry[0]))
+            results.append([f"{seq_len}_seq", top])
+        return results
@@ -0,0 +1,96 @@
+from typing import List, Dict, Tuple
+
+from .corpus import Corpus
+
+
+class NGramIndex:
+    """Lazily built inverted index mapping sequences to the sentences they appear in"""
+
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
+        self._postings_by_len: Dict[int, Dict[Tuple[int, ...], Dict[int, int]]] = {}
+
+    def postings(self, seq_len: int) -> Dict[Tuple[int, ...], Dict[int, int]]:
+        """
+        Get the postings of all sequences of given length.
+        The postings are built on the first request and cached for the next ones.
+
+        :param seq_len: length of sequences
+        :return: a dict mapping sequences of word ids to {sentence id: occurrences in sentence}
+        """
+        if seq_len not in self._postings_by_len:
+            self._postings_by_len[seq_len] = self._build(seq_len)
+        return self._postings_by_len[seq_len]
+
+    def _build(self, seq_len: int) -> Dict[Tuple[int, ...], Dict[int, int]]:
+        """
+        Scan the corpus once and map each sequence of given length to its postings list.
+        Sentence ids are inserted in ascending order.
+
+        :param seq_len: length of sequences
+        :return: a dict mapping sequences of word ids to {sentence id: occurrences in sentence}
+        """
+        postings = {}
+        self._add_sentences(postings, seq_len, 0)
+        return postings
+
+    def _add_sentences(self, postings: Dict[Tuple[int, ...], Dict[int, int]], seq_len: int, start: int) -> None:
+        """
+        Add the sequences of the sentences from a given id to the end of the corpus to postings.
+
+        :param postings: postings of sequences of given length
+        :param seq_len: length of sequences
+        :param start: id of the first sentence to add
+        """
+        for sentence_id, word_ids in enumerate(self.corpus.iter_token_ids(start), start=start):
+            for i in range(len(word_ids) - seq_len + 1):
+                seq_postings = postings.setdefault(tuple(word_ids[i:i + seq_len]), {})
+                seq_postings[sentence_id] = seq_postings.get(sentence_id, 0) + 1
+
+    def extend(self, start: int) -> None:
+        """
+        Add sentences that were appended to the corpus to all the postings that were already built.
+
+        :param start: id of the first appended sentence
+        """
+        for seq_len, postings in self._postings_by_len.items():
+            self._add_sentences(postings, seq_len, start)
+
+    def decode(self, seq: Tuple[int, ...]) -> str:
+        """
+        Convert an indexed sequence back to text.
+
+        :param seq: sequence of word ids
+        :return: the words of the sequence joined by spaces
+        """
+        return ' '.join(self.corpus.vocabulary.decode(seq))
+
+    def lookup(self, sequence: List[str]) -> Dict[int, int]:
+        """
+        Find the postings of a single sequence.
+
+        :param sequence: sequence as a list of words
+        :return: {sentence id: occurrences in sentence}, empty if the sequence never appears
+        """
+        seq = self.corpus.vocabulary.encode(sequence)
+        if seq is None:
+            return {}
+        return self.postings(len(seq)).get(seq, {})
+
+    def count(self, sequence: List[str]) -> int:
+        """
+        Count how many times a sequence appears in the text.
+
+        :param sequence: sequence as a list of words
+        :return: number of occurrences
+        """
+        return sum(self.lookup(sequence).values())
+
+    def sentence_ids(self, sequence: List[str]) -> List[int]:
+        """
+        Find the ids of the sentences a sequence appears in.
+
+        :param sequence: sequence as a list of words
+        :return: sorted sentence ids
+        """
+        return list(self.lookup(sequence).keys())
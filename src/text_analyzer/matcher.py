@@ -0,0 +1,115 @@
+from collections import deque
+from typing import List, Dict, Tuple, Optional
+
+from .corpus import Corpus, Vocabulary
+
+
+class NameMatcher:
+    """
+    Aho-Corasick automaton over word ids.
+    Finds every person's names and nicknames in a single pass over the sentences.
+    Names with words that are not in the vocabulary can never appear, so they are left out.
+    """
+
+    def __init__(self, persons: List[List[List[str]]], vocabulary: Vocabulary):
+        self.persons = persons
+        self.vocabulary = vocabulary
+        self._goto: List[Dict[int, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]  # pattern ids ending at each node
+        self._counted_by: List[List[int]] = []  # pattern id -> persons counting each occurrence
+        self._located_by: List[List[int]] = []  # pattern id -> persons located by the pattern
+        self._located_everywhere: List[int] = []  # persons with an empty nickname
+        self._pattern_ids: Dict[Tuple[int, ...], int] = {}
+
+        for person_id, person in enumerate(persons):
+            main_name, nicknames = person[0], person[1]
+            for word in set(main_name + [word for nickname in nicknames for word in nickname]):
+                pattern_id = self._add_pattern((word,))
+                if pattern_id is not None:
+                    self._counted_by[pattern_id].append(person_id)
+            names_to_locate = {(word,) for word in main_name} | {tuple(nickname) for nickname in nicknames}
+            if main_name:
+                names_to_locate.add(tuple(main_name))
+            for name in names_to_locate:
+                if len(name) == 0:
+                    # an empty sequence is found in every sentence
+                    self._located_everywhere.append(person_id)
+                    continue
+                pattern_id = self._add_pattern(name)
+                if pattern_id is not None:
+                    self._located_by[pattern_id].append(person_id)
+
+        self._build_fail_links()
+
+    def _add_pattern(self, words: Tuple[str, ...]) -> Optional[int]:
+        """
+        Insert a pattern into the trie.
+
+        :param words: sequence of words
+        :return: pattern id, None if the pattern has words that are not in the vocabulary
+        """
+        pattern = self.vocabulary.encode(list(words))
+        if pattern is None:
+            return None
+        if pattern in self._pattern_ids:
+            return self._pattern_ids[pattern]
+
+        node = 0
+        for word_id in pattern:
+            if word_id not in self._goto[node]:
+                self._goto[node][word_id] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = self._goto[node][word_id]
+
+        pattern_id = len(self._counted_by)
+        self._pattern_ids[pattern] = pattern_id
+        self._counted_by.append([])
+        self._located_by.append([])
+        self._outputs[node].append(pattern_id)
+        return pattern_id
+
+    def _build_fail_links(self) -> None:
+        """Compute failure links with a BFS over the trie and merge the outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word_id, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and word_id not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word_id, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                queue.append(child)
+
+    def match(self, corpus: Corpus, start: int = 0) -> Tuple[List[int], List[List[int]]]:
+        """
+        Scan all sentences once and find all persons in them.
+
+        :param corpus: interned sentences
+        :param start: id of the first sentence to scan
+        :return: mention count of each person and sorted ids of the sentences each person appears in
+        """
+        counts = [0] * len(self.persons)
+        sentence_ids: List[List[int]] = [[] for _ in self.persons]
+
+        for sentence_id, sentence in enumerate(corpus.iter_token_ids(start), start=start):
+            for person_id in self._located_everywhere:
+                sentence_ids[person_id].append(sentence_id)
+
+            node = 0
+            for word_id in sentence:
+                while node and word_id not in self._goto[node]:
+                    node = self._fail[node]
+                node = self._goto[node].get(word_id, 0)
+
+                for pattern_id in self._outputs[node]:
+                    for person_id in self._counted_by[pattern_id]:
+                        counts[person_id] += 1
+                    for person_id in self._located_by[pattern_id]:
+                        if not sentence_ids[person_id] or sentence_ids[person_id][-1] != sentence_id:
+                            sentence_ids[person_id].append(sentence_id)
+
+        return counts, sentence_ids
@@ -0,0 +1,204 @@
+import threading
+from typing import List, Dict, Tuple, Iterable
+
+import numpy as np
+
+from .corpus import Corpus
+
+
+class NGramHasher:
+    """
+    Groups equal sequences of the corpus with vectorized rolling hashes over the token array.
+
+    The hash of the sequence of length n starting at position i is computed from the one of length n - 1:
+        hash_n[i] = hash_{n-1}[i] * BASE + tokens[i + n - 1]    (mod 2^64)
+    so all the sequences of each length are hashed with one array operation, without building tuples or strings.
+    Sequences with equal hashes are checked to be equal. If two different sequences ever collide,
+    that length is grouped by comparing the word ids of the sequences instead.
+    Sequences are decoded to words only when they are part of a result.
+    The caches are filled under a lock, so a hasher can be shared by concurrent queries.
+    """
+
+    # odd 64 bit multiplier, the golden ratio constant spreads the bits of small word ids
+    BASE = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
+        self.words = np.array(corpus.vocabulary.words, dtype=object)
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._hashes_len = 0
+        # per length: group id of each sequence, by its index among the sequences of that length,
+        # index of the first sequence of each sentence, first position of each group
+        # and number of sequences in each group
+        self._groups: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        # per length: words of each group that was decoded, and which groups were decoded
+        self._decoded: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        # per maximal length: rank of each group of each length among all the sequences in word order
+        self._ranks: Dict[int, List[np.ndarray]] = {}
+        # reentrant, ranks and decode compute groups while holding it
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        Concatenate ranges of integers, without a Python loop.
+
+        :param starts: first integer of each range
+        :param lengths: number of integers in each range
+        :return: the integers of all the ranges, in order
+        """
+        # each range is shifted from a running count
+        return np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+    def _window_hashes(self, seq_len: int) -> np.ndarray:
+        """
+        Hash the sequences of given length starting at every position, including ones crossing sentences.
+        The hashes are updated in place from the int32 tokens, so the tokens are never copied.
+
+        :param seq_len: length of sequences
+        :return: hash of the sequence starting at each position that has seq_len tokens after it
+        """
+        if self._hashes_len == 0 or self._hashes_len > seq_len:
+            self._hashes, self._hashes_len = self.corpus.tokens.astype(np.uint64), 1
+        while self._hashes_len < seq_len:
+            self._hashes_len += 1
+            self._hashes = self._hashes[:-1]
+            np.multiply(self._hashes, self.BASE, out=self._hashes)
+            np.add(self._hashes, self.corpus.tokens[self._hashes_len - 1:], out=self._hashes, casting='unsafe')
+        return self._hashes
+
+    def groups(self, seq_len: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Group the sequences of given length that are inside a sentence.
+        Sequences are indexed in the order of their start positions, and the groups are
+        computed once per length and cached.
+
+        :param seq_len: length of sequences
+        :return: group id of each sequence, index of the first sequence of each sentence and the number of
+                 sequences, first position of each group, and number of sequences in each group
+        """
+        with self._lock:
+            if seq_len not in self._groups:
+                hashes = self._window_hashes(seq_len)
+                sequences_in_sentence = np.maximum(np.diff(self.corpus.offsets) - seq_len + 1, 0)
+                starts = self.ranges(self.corpus.offsets[:-1], sequences_in_sentence)
+
+                _, first_index, group_of_start, counts = np.unique(
+                    hashes[starts], return_index=True, return_inverse=True, return_counts=True)
+                if not self._same_sequences(starts, starts[first_index][group_of_start], seq_len):
+                    windows = self.corpus.tokens[starts[:, np.newaxis] + np.arange(seq_len)]
+                    _, first_index, group_of_start, counts = np.unique(
+                        windows, axis=0, return_index=True, return_inverse=True, return_counts=True)
+
+                group_dtype = np.int32 if len(counts) <= np.iinfo(np.int32).max else np.int64
+                start_offsets = np.concatenate([[0], np.cumsum(sequences_in_sentence)])
+                self._groups[seq_len] = (group_of_start.reshape(-1).astype(group_dtype), start_offsets,
+                                         starts[first_index], counts)
+            return self._groups[seq_len]
+
+    def sentence_groups(self, seq_len: int, sentence_ids: np.ndarray) -> np.ndarray:
+        """
+        Get the groups of the sequences of given length in some of the sentences.
+
+        :param seq_len: length of sequences
+        :param sentence_ids: ids of the sentences
+        :return: group id of each sequence of the sentences, with repetitions
+        """
+        group_of_start, start_offsets, _, _ = self.groups(seq_len)
+        first_sequences = start_offsets[sentence_ids]
+        return group_of_start[self.ranges(first_sequences, start_offsets[sentence_ids + 1] - first_sequences)]
+
+    def _same_sequences(self, starts: np.ndarray, other_starts: np.ndarray, seq_len: int) -> bool:
+        """
+        Check that the sequences starting at two arrays of positions are equal, pair by pair.
+
+        :param starts: start positions
+        :param other_starts: start positions of the sequences to compare to
+        :param seq_len: length of sequences
+        :return: True if all the pairs are equal
+        """
+        tokens = self.corpus.tokens
+        return all(np.array_equal(tokens[starts + i], tokens[other_starts + i]) for i in range(seq_len))
+
+    def decode(self, seq_len: int, groups: np.ndarray) -> np.ndarray:
+        """
+        Get the words of the sequences of some groups.
+        Each group is decoded at most once, all the groups missing from the cache are decoded together.
+
+        :param seq_len: length of sequences
+        :param groups: group ids
+        :return: object array with the list of words of each group's sequence
+        """
+        with self._lock:
+            _, _, first_positions, counts = self.groups(seq_len)
+            if seq_len not in self._decoded:
+                self._decoded[seq_len] = (np.empty(len(counts), dtype=object),
+                                          np.zeros(len(counts), dtype=bool))
+            decoded, is_decoded = self._decoded[seq_len]
+
+            missing = np.unique(groups[~is_decoded[groups]])
+            if len(missing) > 0:
+                windows = self.corpus.tokens[first_positions[missing][:, np.newaxis] + np.arange(seq_len)]
+                for group, words in zip(missing.tolist(), self.words[windows].tolist()):
+                    decoded[group] = words
+                is_decoded[missing] = True
+            return decoded[groups]
+
+    def ranks(self, max_len: int) -> List[np.ndarray]:
+        """
+        Rank the sequences of lengths 1 to max_len together, in the order of their lists of words.
+        Sequences are ranked by the ranks of their words, so nothing is decoded.
+
+        :param max_len: maximal length of sequences
+        :return: for each length, the rank of each group
+        """
+        with self._lock:
+            if max_len not in self._ranks:
+                # 0 pads shorter sequences, so a sequence comes before the ones it is a prefix of
+                word_ranks = np.zeros(len(self.words), dtype=np.int64)
+                word_ranks[np.argsort(np.array(self.corpus.vocabulary.words, dtype=str), kind='stable')] = \
+                    np.arange(1, len(self.words) + 1)
+                keys = []
+                for seq_len in range(1, max_len + 1):
+                    first_positions = self.groups(seq_len)[2]
+                    key = np.zeros((len(first_positions), max_len), dtype=np.int64)
+                    windows = self.corpus.tokens[first_positions[:, np.newaxis] + np.arange(seq_len)]
+                    key[:, :seq_len] = word_ranks[windows]
+                    keys.append(key)
+                all_keys = np.concatenate(keys)
+                ranks = np.empty(len(all_keys), dtype=np.int64)
+                ranks[np.lexsort(all_keys.T[::-1])] = np.arange(len(all_keys))
+                self._ranks[max_len] = np.split(ranks, np.cumsum([len(key) for key in keys])[:-1])
+            return self._ranks[max_len]
+
+    def counts(self, seq_len: int) -> List[List]:
+        """
+        Count the sequences of given length.
+
+        :param seq_len: length of sequences
+        :return: sorted [sequence text, count] pairs
+        """
+        _, _, first_positions, counts = self.groups(seq_len)
+        # every group is in the result, so they are decoded straight to text without the cache
+        windows = self.corpus.tokens[first_positions[:, np.newaxis] + np.arange(seq_len)]
+        texts = [' '.join(words) for words in self.words[windows].tolist()]
+        return [[texts[group], count] for group, count in
+                sorted(zip(range(len(texts)), counts.tolist()), key=lambda entry: texts[entry[0]])]
+
+    def context(self, sentence_ids: Iterable[int], max_len: int) -> List[List[str]]:
+        """
+        Find the distinct sequences of lengths 1 to max_len in some of the sentences.
+
+        :param sentence_ids: ids of the sentences
+        :param max_len: maximal length of sequences
+        :return: sorted sequences, as lists of words. The lists are shared by all the contexts
+        """
+        if max_len < 1:
+            return []
+        sentence_ids = np.asarray(sentence_ids, dtype=np.int64)
+        sequences, sequence_ranks = [], []
+        for seq_len, ranks in enumerate(self.ranks(max_len), start=1):
+            groups = np.unique(self.sentence_groups(seq_len, sentence_ids))
+            sequences.append(self.decode(seq_len, groups))
+            sequence_ranks.append(ranks[groups])
+        return np.concatenate(sequences)[np.argsort(np.concatenate(sequence_ranks))].tolist()
@@ -0,0 +1,133 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Tuple, Iterator
+
+import numpy as np
+
+from .ngram_hashing import NGramHasher
+
+# arrays attached by each worker process, by name
+_worker_arrays: Dict[str, np.ndarray] = {}
+_worker_blocks: List[shared_memory.SharedMemory] = []
+
+
+def _attach(specs: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> None:
+    """
+    Attach the shared arrays in a worker process.
+
+    :param specs: array name mapped to (shared memory block name, shape, dtype)
+    """
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        _worker_arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _ordered_group_ids(persons_sentence_ids: List[List[int]]) -> List[np.ndarray]:
+    """
+    Find the context of each person as global group ids, in word order.
+    Runs in a worker process, over the shared arrays.
+
+    :param persons_sentence_ids: ids of the sentences of each person
+    :return: for each person, global ids of the groups of their distinct sequences, sorted by rank
+    """
+    start_offsets, group_of_start = _worker_arrays["start_offsets"], _worker_arrays["group_of_start"]
+    sequence_offsets = _worker_arrays["sequence_offsets"]
+    group_offsets, ranks = _worker_arrays["group_offsets"], _worker_arrays["ranks"]
+
+    results = []
+    for sentence_ids in persons_sentence_ids:
+        sentence_ids = np.asarray(sentence_ids, dtype=np.int64)
+        group_ids = []
+        for seq_len_index, start_offsets_of_len in enumerate(start_offsets):
+            first_sequences = start_offsets_of_len[sentence_ids] + sequence_offsets[seq_len_index]
+            sequences = NGramHasher.ranges(first_sequences, start_offsets_of_len[sentence_ids + 1] -
+                                           start_offsets_of_len[sentence_ids])
+            group_ids.append(np.unique(group_of_start[sequences]) + group_offsets[seq_len_index])
+        group_ids = np.concatenate(group_ids)
+        results.append(group_ids[np.argsort(ranks[group_ids])])
+    return results
+
+
+class ParallelContext:
+    """
+    Finds the contexts of many persons across a process pool.
+
+    The group of every sequence of each length is computed once in the main process,
+    and shared with the workers with multiprocessing.shared_memory, so every sentence's sequences are
+    grouped once no matter how many persons appear in it. Workers only return group ids in word order,
+    and the main process decodes each group once for all the persons.
+    """
+
+    # number of persons sent to a worker at once
+    PERSONS_PER_TASK = 32
+
+    @classmethod
+    def contexts(cls,
+                 hasher: NGramHasher,
+                 persons_sentence_ids: List[List[int]],
+                 max_len: int,
+                 workers: int) -> Iterator[List[List[str]]]:
+        """
+        Find the distinct sequences of lengths 1 to max_len in the sentences of each person.
+        Contexts are generated in the order of the persons, as the workers finish them.
+
+        :param hasher: hasher of the text
+        :param persons_sentence_ids: ids of the sentences of each person
+        :param max_len: maximal length of sequences
+        :param workers: number of worker processes
+        :return: generator of each person's sorted sequences as lists of words,
+                 the lists are shared by all the contexts
+        """
+        if max_len < 1:
+            yield from ([] for _ in persons_sentence_ids)
+            return
+
+        ranks = hasher.ranks(max_len)
+        group_offsets = np.cumsum([0] + [len(ranks_of_len) for ranks_of_len in ranks])
+        groups = [hasher.groups(seq_len) for seq_len in range(1, max_len + 1)]
+        arrays = {
+            "start_offsets": np.stack([start_offsets for _, start_offsets, _, _ in groups]),
+            # the groups of the sequences of all lengths, each length starts at its sequence offset
+            "group_of_start": np.concatenate([group_of_start for group_of_start, _, _, _ in groups]),
+            "sequence_offsets": np.cumsum([0] + [len(group_of_start) for group_of_start, _, _, _ in groups[:-1]]),
+            "group_offsets": group_offsets[:-1],
+            "ranks": np.concatenate(ranks)
+        }
+
+        blocks = []
+        try:
+            specs = {}
+            for name, array in arrays.items():
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                specs[name] = (block.name, array.shape, array.dtype.str)
+
+            tasks = [persons_sentence_ids[i:i + cls.PERSONS_PER_TASK]
+                     for i in range(0, len(persons_sentence_ids), cls.PERSONS_PER_TASK)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as executor:
+                for task_result in executor.map(_ordered_group_ids, tasks):
+                    for group_ids in task_result:
+                        yield cls._decode(hasher, group_ids, group_offsets)
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    @staticmethod
+    def _decode(hasher: NGramHasher, group_ids: np.ndarray, group_offsets: np.ndarray) -> List[List[str]]:
+        """
+        Decode global group ids to sequences.
+
+        :param hasher: hasher of the text
+        :param group_ids: global group ids
+        :param group_offsets: first global id of each length, and the number of ids
+        :return: the sequence of each group, as a list of words
+        """
+        seq_lens = np.searchsorted(group_offsets, group_ids, side='right')
+        sequences = np.empty(len(group_ids), dtype=object)
+        for seq_len in np.unique(seq_lens).tolist():
+            is_of_len = seq_lens == seq_len
+            sequences[is_of_len] = hasher.decode(seq_len, group_ids[is_of_len] - group_offsets[seq_len - 1])
+        return sequences.tolist()
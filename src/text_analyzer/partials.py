@@ -0,0 +1,201 @@
+import gzip
+import json
+from typing import List, Dict, Tuple, Any, Optional
+
+
+class PartialResults:
+    """
+    Mergeable aggregates of one corpus shard, so shards can be analyzed on different machines.
+    A shard holds consecutive sentences, and shards are merged by their index.
+
+    Windows that cross shard boundaries are counted at merge time. Each shard keeps the persons
+    of its first and last window_size - 1 sentences, and every crossing window is counted once,
+    by the shard its last sentence belongs to.
+    """
+
+    FORMAT = "text-analyzer-partial"
+    VERSION = 1
+
+    @classmethod
+    def dump(cls, path: str, partial: Dict[str, Any]) -> None:
+        """
+        Write partial results to a gzipped JSON file.
+
+        :param path: path of the file to write
+        :param partial: partial results of a shard
+        """
+        with gzip.open(path, 'wt') as file:
+            json.dump({"format": cls.FORMAT, "version": cls.VERSION, **partial}, file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> Dict[str, Any]:
+        """
+        Read partial results written by dump.
+
+        :param path: path of the file to read
+        :return: partial results of a shard
+        """
+        with gzip.open(path, 'rt') as file:
+            partial = json.load(file)
+        if partial.get("format") != cls.FORMAT or partial.get("version") != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} partial results file.")
+        return partial
+
+    @staticmethod
+    def _check_same(partials: List[Dict[str, Any]], key: str) -> Any:
+        """
+        Check all shards were analyzed with the same parameter.
+
+        :param partials: partial results of all shards
+        :param key: parameter name
+        :return: the parameter value
+        """
+        values = {partial[key] for partial in partials}
+        if len(values) > 1:
+            raise ValueError(f"Partial results were exported with different {key}: {sorted(values)}")
+        return values.pop()
+
+    @classmethod
+    def merge_sequence_counts(cls, partials: List[Dict[str, Any]]) -> List[List[Any]]:
+        """
+        Merge the sequence counts of all shards.
+
+        :param partials: partial results of all shards
+        :return: same as TextAnalyzer.count_sequences on the whole corpus
+        """
+        if cls._check_same(partials, "maxk") is None:
+            raise ValueError("Partial results were exported without maxk.")
+
+        merged: Dict[str, Dict[str, int]] = {}
+        for partial in partials:
+            for seq_len_key, counts in partial["sequence_counts"]:
+                seq_counts = merged.setdefault(seq_len_key, {})
+                for seq, count in counts:
+                    seq_counts[seq] = seq_counts.get(seq, 0) + count
+
+        return [[f"{seq_len}_seq", sorted([list(item) for item in merged.get(f"{seq_len}_seq", {}).items()])]
+                for seq_len in range(1, partials[0]["maxk"] + 1)]
+
+    @staticmethod
+    def merge_person_mentions(partials: List[Dict[str, Any]]) -> List[List[Any]]:
+        """
+        Merge the person mention counts of all shards.
+
+        :param partials: partial results of all shards
+        :return: same as TextAnalyzer.count_person_mentions on the whole corpus
+        """
+        merged: Dict[str, int] = {}
+        for partial in partials:
+            for person, count in partial["mention_counts"]:
+                merged[person] = merged.get(person, 0) + count
+        return sorted([person, count] for person, count in merged.items() if count > 0)
+
+    @classmethod
+    def merge_pair_counts(cls, partials: List[Dict[str, Any]]) -> Dict[Tuple[str, str], int]:
+        """
+        Merge the shared windows of each pair of persons from all shards,
+        including the windows that cross shard boundaries.
+
+        :param partials: partial results of all shards
+        :return: pairs (sorted by name) mapped to the number of shared windows
+        """
+        window_size = cls._check_same(partials, "window_size")
+        if window_size is None:
+            raise ValueError("Partial results were exported without a window size.")
+
+        merged: Dict[Tuple[str, str], int] = {}
+
+        def add_pair(person_a: str, person_b: str, count: int) -> None:
+            """add windows to a pair."""
+            pair = (person_a, person_b) if person_a < person_b else (person_b, person_a)
+            merged[pair] = merged.get(pair, 0) + count
+
+        pending: List[List[str]] = []  # persons of the last window_size - 1 sentences before the current shard
+        for partial in sorted(partials, key=lambda p: p["shard_index"]):
+            persons = partial["persons"]
+            for person_a, person_b, count in partial["pair_counts"]:
+                add_pair(persons[person_a], persons[person_b], count)
+
+            head = [[persons[i] for i in sentence] for sentence in partial["head"]]
+            tail = [[persons[i] for i in sentence] for sentence in partial["tail"]]
+            combined = pending + head
+            for end in range(len(pending), len(combined)):
+                start = end - window_size + 1
+                if start < 0:  # the window starts before the first sentence
+                    continue
+                window_persons = sorted({person for sentence in combined[start:end + 1] for person in sentence})
+                for i, person_a in enumerate(window_persons):
+                    for person_b in window_persons[i + 1:]:
+                        add_pair(person_a, person_b, 1)
+
+            if partial["num_sentences"] < window_size - 1:  # the head holds the whole shard
+                pending = combined[-(window_size - 1):] if window_size > 1 else []
+            else:
+                pending = tail
+        return merged
+
+    @classmethod
+    def merge_connections(cls, partials: List[Dict[str, Any]], threshold: int) -> List[List[List[str]]]:
+        """
+        Merge the connections of all shards.
+
+        :param partials: partial results of all shards
+        :param threshold: Minimum number of windows two people must appear together
+        :return: same as TextAnalyzer.find_connections on the whole corpus
+        """
+        if threshold > 0:
+            pairs = [pair for pair, count in cls.merge_pair_counts(partials).items() if count >= threshold]
+        else:  # every pair passes, even if they never appear together
+            found = sorted({person for partial in partials for person in partial["persons_found"]})
+            pairs = [(person_a, person_b) for i, person_a in enumerate(found) for person_b in found[i + 1:]]
+        return sorted(sorted([person_a.split(), person_b.split()]) for person_a, person_b in pairs)
+
+    @staticmethod
+    def shard_partial(persons: List[str],
+                      mention_counts: List[int],
+                      persons_sentence_ids: List[List[int]],
+                      num_sentences: int,
+                      shard_index: int,
+                      maxk: Optional[int],
+                      sequence_counts: List[List[Any]],
+                      window_size: Optional[int],
+                      pair_counts: Dict[Tuple[str, str], int]) -> Dict[str, Any]:
+        """
+        Build the partial results of a shard.
+
+        :param persons: full names of all persons
+        :param mention_counts: mention count of each person in the shard
+        :param persons_sentence_ids: sorted ids of the shard sentences each person appears in
+        :param num_sentences: number of sentences in the shard
+        :param shard_index: position of the shard in the whole corpus
+        :param maxk: maximal length of the counted sequences, None if they were not counted
+        :param sequence_counts: output of TextAnalyzer.count_sequences on the shard
+        :param window_size: size of windows, None if pairs were not counted
+        :param pair_counts: pairs mapped to their shared windows inside the shard
+        :return: partial results
+        """
+        person_ids = {person: i for i, person in enumerate(persons)}
+        boundary = window_size - 1 if window_size is not None else 0
+        head: List[List[int]] = [[] for _ in range(min(boundary, num_sentences))]
+        tail: List[List[int]] = [[] for _ in range(min(boundary, num_sentences))]
+        for person_id, sentence_ids in enumerate(persons_sentence_ids):
+            for sentence_id in sentence_ids:
+                if sentence_id < len(head):
+                    head[sentence_id].append(person_id)
+                if sentence_id >= num_sentences - len(tail):
+                    tail[sentence_id - (num_sentences - len(tail))].append(person_id)
+
+        return {
+            "shard_index": shard_index,
+            "num_sentences": num_sentences,
+            "persons": persons,
+            "maxk": maxk,
+            "sequence_counts": sequence_counts,
+            "mention_counts": [[person, count] for person, count in zip(persons, mention_counts) if count > 0],
+            "persons_found": [person for person, ids in zip(persons, persons_sentence_ids) if ids],
+            "window_size": window_size,
+            "pair_counts": [[person_ids[person_a], person_ids[person_b], count]
+                            for (person_a, person_b), count in pair_counts.items()],
+            "head": head,
+            "tail": tail
+        }
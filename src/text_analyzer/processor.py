@@ -1,12 +1,18 @@
 import string
 import pandas as pd
 import re
-from typing import List, Optional
+from typing import List, Optional, Set, Iterable, Iterator
 
 
 class TextProcessor:
     """Handles all basic text processing operations"""
 
+    # maps every punctuation character to a space
+    PUNCTUATION_TABLE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+    ASCII_PUNCTUATION_TABLE = bytes.maketrans(string.punctuation.encode(), b' ' * len(string.punctuation))
+    # joins texts for batch processing, it is neither punctuation nor whitespace and is unchanged by lower()
+    TEXT_SEPARATOR = '\x00'
+
     @staticmethod
     def process_string(string_to_process: str) -> str:
         """
@@ -19,20 +25,74 @@ class TextProcessor:
         :return: processed text.
         """
         processed_text = string_to_process.lower()
-        processed_text = ''.join([char if char not in string.punctuation else ' '
-                                  for char in processed_text])  # remove punctuation
+        processed_text = processed_text.translate(TextProcessor.PUNCTUATION_TABLE)  # remove punctuation
         processed_text = re.sub(r'\s+', ' ', processed_text)  # remove consecutive whitespaces
         processed_text = processed_text.strip()
         return processed_text
 
     @staticmethod
-    def process_unwanted_words(path_to_unwanted_words: Optional[str]) -> List[str]:
+    def process_strings(strings: pd.Series) -> pd.Series:
+        """
+        Process a whole column of text at once, with the same result as process_string on each text.
+        The texts are joined and translated together, with a byte level table when they are ASCII.
+        :param strings: texts to be processed, missing values are treated as empty strings.
+        :return: processed texts.
+        """
+        texts = strings.fillna('').astype(str).tolist()
+        if len(texts) == 0:
+            return pd.Series([], index=strings.index, dtype=object)
+        joined_text = TextProcessor.TEXT_SEPARATOR.join(texts)
+        if joined_text.count(TextProcessor.TEXT_SEPARATOR) != len(texts) - 1:
+            # the separator appears in the texts themselves, process them one by one
+            processed_texts = [TextProcessor.process_string(text) for text in texts]
+            return pd.Series(processed_texts, index=strings.index, dtype=object)
+
+        joined_text = joined_text.lower()
+        if joined_text.isascii():
+            joined_text = joined_text.encode('ascii').translate(TextProcessor.ASCII_PUNCTUATION_TABLE)
+            joined_text = joined_text.decode('ascii')
+        else:
+            joined_text = joined_text.translate(TextProcessor.PUNCTUATION_TABLE)  # remove punctuation
+
+        processed_texts = [' '.join(text.split())  # remove consecutive whitespaces + strip
+                           for text in joined_text.split(TextProcessor.TEXT_SEPARATOR)]
+        return pd.Series(processed_texts, index=strings.index, dtype=object)
+
+    @staticmethod
+    def split_and_filter(strings: Iterable[str], unwanted_words: Set[str]) -> List[List[str]]:
+        """
+        Split processed texts to words and remove unwanted words.
+        :param strings: processed texts.
+        :param unwanted_words: words to remove.
+        :return: list of words of each text.
+        """
+        return [[word for word in text.split() if word not in unwanted_words] for text in strings]
+
+    @staticmethod
+    def iter_sentence_chunks(path_to_sentences: str,
+                             unwanted_words: Set[str],
+                             chunk_size: int) -> Iterator[List[List[str]]]:
+        """
+        Read a sentences file chunk by chunk, and process each chunk on its own.
+        Only the raw text of the current chunk is held in memory.
+        :param path_to_sentences: path to sentences CSV file, the sentences are in the first column.
+        :param unwanted_words: words to remove.
+        :param chunk_size: number of rows to read at once.
+        :return: generator of chunks, each one is a list of non-empty sentences as lists of words.
+        """
+        for chunk in pd.read_csv(path_to_sentences, dtype=str, chunksize=chunk_size):
+            sentences = TextProcessor.process_strings(chunk[chunk.columns[0]])  # basic preprocess
+            sentences = TextProcessor.split_and_filter(sentences, unwanted_words)  # split + remove unwanted words
+            yield [sentence for sentence in sentences if sentence]  # remove empty sentences
+
+    @staticmethod
+    def process_unwanted_words(path_to_unwanted_words: Optional[str]) -> Set[str]:
         """
         Read a file of unwanted words.
         :param path_to_unwanted_words: path to unwanted words file.
-        :return: list of unwanted words.
+        :return: set of unwanted words.
         """
-        return list(pd.read_csv(path_to_unwanted_words).iloc[:, 0]) if path_to_unwanted_words else []
+        return set(pd.read_csv(path_to_unwanted_words).iloc[:, 0]) if path_to_unwanted_words else set()
 
     @staticmethod
     def get_sequences_from_sentence(sentence: List[str],
@@ -0,0 +1,145 @@
+import os
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .corpus import Corpus
+
+
+class SuffixArrayIndex:
+    """
+    Token level suffix array over the whole corpus.
+    Finds sequences of any length in O(length * log(corpus size)) without building per-length maps.
+
+    The sentences are concatenated with a separator after each one. The separator is smaller
+    than every word id and never appears in a query, so matches never cross sentences.
+    """
+
+    SEPARATOR = 0
+
+    def __init__(self, corpus: Corpus, suffix_array: Optional[np.ndarray] = None):
+        self.corpus = corpus
+        # word ids are shifted by one to make room for the separator
+        self.text = np.insert(corpus.tokens.astype(np.int64) + 1, corpus.offsets[1:], self.SEPARATOR)
+        self.sentence_starts = corpus.offsets[:-1] + np.arange(len(corpus))
+        self.suffix_array = suffix_array if suffix_array is not None else self._build(self.text)
+
+    @staticmethod
+    def _build(text: np.ndarray) -> np.ndarray:
+        """
+        Sort all suffixes of the text by prefix doubling.
+        Each round sorts by the ranks of the first k tokens and of the next k tokens,
+        so all suffixes are sorted after O(log n) rounds.
+
+        :param text: the text
+        :return: start positions of the suffixes in sorted order
+        """
+        n = len(text)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rank = np.unique(text, return_inverse=True)[1].astype(np.int64)
+        k = 1
+        while True:
+            next_rank = np.full(n, -1, dtype=np.int64)
+            next_rank[:n - k] = rank[k:]
+            suffix_array = np.lexsort((next_rank, rank))
+
+            sorted_rank, sorted_next = rank[suffix_array], next_rank[suffix_array]
+            is_new_group = np.empty(n, dtype=bool)
+            is_new_group[0] = True
+            is_new_group[1:] = (sorted_rank[1:] != sorted_rank[:-1]) | (sorted_next[1:] != sorted_next[:-1])
+            rank = np.empty(n, dtype=np.int64)
+            rank[suffix_array] = np.cumsum(is_new_group) - 1
+
+            if rank.max() == n - 1 or k >= n:
+                return suffix_array.astype(np.int64)
+            k *= 2
+
+    def _bound(self, query: np.ndarray, upper: bool) -> int:
+        """
+        Binary search the suffix array for a query.
+
+        :param query: shifted word ids
+        :param upper: search the first suffix after the matches if True, the first match otherwise
+        :return: position in the suffix array
+        """
+        low, high = 0, len(self.suffix_array)
+        query_list = query.tolist()
+        while low < high:
+            middle = (low + high) // 2
+            start = self.suffix_array[middle]
+            prefix = self.text[start:start + len(query)].tolist()
+            if prefix < query_list or (upper and prefix == query_list):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, sequence: List[str]) -> Dict[int, int]:
+        """
+        Find the postings of a single sequence.
+
+        :param sequence: sequence as a list of words
+        :return: {sentence id: occurrences in sentence}, empty if the sequence never appears
+        """
+        seq = self.corpus.vocabulary.encode(sequence)
+        if seq is None:
+            return {}
+        if len(seq) == 0:  # the empty sequence is found between every two words of every sentence
+            lengths = np.diff(self.corpus.offsets) + 1
+            return {sentence_id: int(length) for sentence_id, length in enumerate(lengths)}
+
+        query = np.array(seq, dtype=np.int64) + 1
+        first, last = self._bound(query, upper=False), self._bound(query, upper=True)
+        positions = np.sort(self.suffix_array[first:last])
+        sentence_ids = np.searchsorted(self.sentence_starts, positions, side='right') - 1
+        unique_ids, counts = np.unique(sentence_ids, return_counts=True)
+        return dict(zip(unique_ids.tolist(), counts.tolist()))
+
+    def count(self, sequence: List[str]) -> int:
+        """
+        Count how many times a sequence appears in the text.
+
+        :param sequence: sequence as a list of words
+        :return: number of occurrences
+        """
+        return sum(self.lookup(sequence).values())
+
+    def sentence_ids(self, sequence: List[str]) -> List[int]:
+        """
+        Find the ids of the sentences a sequence appears in.
+
+        :param sequence: sequence as a list of words
+        :return: sorted sentence ids
+        """
+        return list(self.lookup(sequence).keys())
+
+    def save(self, path: str, fingerprint: str) -> None:
+        """
+        Write the suffix array to a file.
+
+        :param path: path of the file to write
+        :param fingerprint: identifier of the corpus the suffix array was built on
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, suffix_array=self.suffix_array, fingerprint=np.array(fingerprint))
+        os.replace(tmp_path, path)  # readers never see a partially written file
+
+    @classmethod
+    def load(cls, path: str, corpus: Corpus, fingerprint: str) -> Optional['SuffixArrayIndex']:
+        """
+        Read a suffix array written by save.
+
+        :param path: path of the file to read
+        :param corpus: interned sentences
+        :param fingerprint: identifier of the corpus
+        :return: the index, None if there is no file or it was built for a different corpus
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            return cls(corpus, data["suffix_array"])
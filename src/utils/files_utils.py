@@ -1,7 +1,68 @@
+import hashlib
 import json
-from typing import Dict, Any
+import os
+from typing import Dict, Any, List, Optional
 
 def read_json_file(path: str) -> Dict[str, Any]:
     """Read and parse a JSON file"""
     with open(path, 'r') as file:
-        return json.load(file)
\ No newline at end of file
+        return json.load(file)
+
+def json_default(value: Any) -> Any:
+    """Serialize lazy result views, for the default argument of json.dump"""
+    if hasattr(value, 'materialize'):
+        return value.materialize()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def hash_files(paths: List[Optional[str]]) -> str:
+    """Hash the content of files, missing paths (None) are hashed as empty markers"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if path is None:
+            digest.update(b'\0none\0')
+            continue
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0end\0')
+    return digest.hexdigest()
+
+def stat_files(paths: List[Optional[str]]) -> List[Optional[List[Any]]]:
+    """Absolute path, size and modification time (ns) of files, missing paths (None) are kept as None"""
+    stats = []
+    for path in paths:
+        if path is None:
+            stats.append(None)
+            continue
+        stat = os.stat(path)
+        stats.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return stats
+
+def hash_files_memoized(paths: List[Optional[str]], memo_path: str, max_entries: int = 32) -> str:
+    """
+    hash_files, remembered in a JSON file by the stat_files of the hashed files.
+    Files that keep their size and modification time are not read again, and files that were only
+    touched or copied are hashed once, then recognized by their new stats.
+
+    :param paths: paths of the files to hash, None for missing files
+    :param memo_path: path of the file mapping stats to hashes, created if missing
+    :param max_entries: number of stats kept in the memo file, the oldest are dropped first
+    :return: the hash of the files
+    """
+    # taken before the files are read, so a file changed while it is hashed is hashed again next time
+    stats_key = json.dumps(stat_files(paths))
+    try:
+        memo = read_json_file(memo_path)
+    except (OSError, ValueError):
+        memo = {}
+    if stats_key in memo:
+        return memo[stats_key]
+
+    digest = hash_files(paths)
+    memo[stats_key] = digest
+    memo = dict(list(memo.items())[-max_entries:])
+    tmp_path = f"{memo_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(memo, file)
+    os.replace(tmp_path, memo_path)  # readers never see a partially written memo
+    return digest
@@ -0,0 +1,46 @@
+import json
+import os
+from benchmarks.corpus_generator import CorpusGenerator
+from benchmarks.run_benchmarks import TASKS, task_arguments
+from main import create_parser
+from src.tasks.task_runner import TaskRunner
+from src.utils.files_utils import read_json_file, json_default
+
+REMOVE_WORDS_PATH = os.path.join('tests/data', 'REMOVEWORDS.csv')
+
+
+def run_generated_tasks(paths):
+    """Run every benchmarked task over generated files, with results as plain JSON values"""
+    results = {}
+    for task_num in TASKS:
+        args = create_parser().parse_args(task_arguments(task_num, paths))
+        results.update(json.loads(json.dumps(TaskRunner(args).run_task(), default=json_default)))
+    return results
+
+
+def test_generated_corpus_runs_all_tasks(tmp_path):
+    generator = CorpusGenerator(num_sentences=300, num_persons=12, seed=1)
+    paths = generator.generate(str(tmp_path), REMOVE_WORDS_PATH)
+    results = run_generated_tasks(paths)
+
+    sentences = results["Question 1"]["Processed Sentences"]
+    assert len(sentences) == 300
+
+    unigram_counts = dict(results["Question 2"]["3-Seq Counts"][0][1])
+    assert sum(unigram_counts.values()) == sum(len(sentence) for sentence in sentences)
+
+    # the first person is the most likely to be mentioned
+    mentions = dict(results["Question 3"]["Name Mentions"])
+    assert mentions[' '.join(generator.persons[0])] > 0
+    assert set(mentions) <= {' '.join(person) for person in generator.persons}
+
+    # every query is taken from the sentences except the last one
+    queries = read_json_file(paths["queries"])["keys"]
+    matched = {sequence for sequence, _ in results["Question 4"]["K-Seq Matches"]}
+    assert matched == {' '.join(query) for query in queries[:-1]}
+
+    assert len(results["Question 6"]["Pair Matches"]) > 0
+    pairs = read_json_file(paths["pairs"])["keys"]
+    assert len(results["Question 7"]["Pair Matches"]) == len(pairs)
+    assert any(connected for _, _, connected in results["Question 7"]["Pair Matches"])
+    assert len(results["Question 8"]["Pair Matches"]) == len(pairs)
@@ -1,9 +1,20 @@
 import pytest
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
 import json
 import os
 from pathlib import Path
-from main import create_parser
+from main import create_parser, write_result
+from src.utils import files_utils
+from src.utils.files_utils import json_default
 from src.tasks.task_runner import TaskRunner
+from src.tasks.task_server import TaskServer
+from src.text_analyzer.analyzer import TextAnalyzer
+from src.text_analyzer.corpus import Corpus, SentenceView
+from src.text_analyzer.graph import Graph
 
 EXAMPLES_PATH = os.path.join('tests/examples')
 REMOVE_WORDS_PATH = os.path.join('tests/data', 'REMOVEWORDS.csv')
@@ -87,4 +98,408 @@ def test_task(question_num, example_path, example_num):
     assert results == expected_results, (
         f"\nExpected: {expected_results}\n"
         f"Got: {results}"
-    )
\ No newline at end of file
+    )
+
+def test_threshold_sweep_matches_task_6():
+    example_path = Path(EXAMPLES_PATH) / "Q6_examples" / "example_1"
+    base_args = ["-r", str(REMOVE_WORDS_PATH), "--windowsize", "4",
+                 "-n", str(example_path / "people_small_1.csv"),
+                 "-s", str(example_path / "sentences_small_1.csv")]
+
+    sweep = TaskRunner(parse_args(["-t", "6", "--thresholds", "1", "4"] + base_args)).run_task()
+    for threshold, edge_count, pairs in sweep["Question 6"]["Threshold Sweep"]:
+        single = TaskRunner(parse_args(["-t", "6", "--threshold", str(threshold)] + base_args)).run_task()
+        assert pairs == single["Question 6"]["Pair Matches"]
+        assert edge_count == len(pairs)
+
+
+def test_parallel_sequence_counts_match_task_2():
+    example_path = Path(EXAMPLES_PATH) / "Q2_examples" / "example_3"
+    args = parse_args(["-t", "2", "-r", str(REMOVE_WORDS_PATH), "--maxk", "5", "--workers", "3",
+                       "-n", str(example_path / "people_small_3.csv"),
+                       "-s", str(example_path / "sentences_small_3.csv")])
+
+    results = TaskRunner(args).run_task()
+
+    with (example_path / "Q2_result3.json").open('r') as file:
+        assert results == json.load(file)
+
+
+def test_parallel_person_contexts_match_task_5():
+    example_path = Path(EXAMPLES_PATH) / "Q5_examples" / "example_4"
+    args = parse_args(["-t", "5", "-r", str(REMOVE_WORDS_PATH), "--maxk", "6", "--workers", "3",
+                       "-n", str(example_path / "people_small_4.csv"),
+                       "-s", str(example_path / "sentences_small_4.csv")])
+    results = TaskRunner(args).run_task()
+
+    with (example_path / "Q5_result4.json").open('r') as file:
+        assert results == json.load(file)
+
+
+def test_spilled_sequence_counts_match_task_2():
+    example_path = Path(EXAMPLES_PATH) / "Q2_examples" / "example_3"
+    args = parse_args(["-t", "2", "-r", str(REMOVE_WORDS_PATH), "--maxk", "5", "--memory_budget", "50",
+                       "-n", str(example_path / "people_small_3.csv"),
+                       "-s", str(example_path / "sentences_small_3.csv")])
+    results = TaskRunner(args).run_task()
+
+    with (example_path / "Q2_result3.json").open('r') as file:
+        assert results == json.load(file)
+
+
+def test_merged_partials_match_task_6(tmp_path):
+    example_path = Path(EXAMPLES_PATH) / "Q6_examples" / "example_2"
+    names_path = str(example_path / "people_small_2.csv")
+    task_args = ["-r", str(REMOVE_WORDS_PATH), "--windowsize", "3", "--threshold", "2"]
+
+    # split the sentences file to shards of consecutive rows
+    lines = (example_path / "sentences_small_2.csv").read_text().splitlines()
+    header, rows = lines[0], lines[1:]
+    partial_paths = []
+    for shard_index, start in enumerate(range(0, len(rows), 7)):
+        shard_path = tmp_path / f"sentences_{shard_index}.csv"
+        shard_path.write_text('\n'.join([header] + rows[start:start + 7]) + '\n')
+        partial_path = str(tmp_path / f"partial_{shard_index}.json.gz")
+        TaskRunner(parse_args(["-t", "6", "--export_partial", partial_path, "--shard_index", str(shard_index),
+                               "-n", names_path, "-s", str(shard_path)] + task_args)).export_partial()
+        partial_paths.append(partial_path)
+
+    merged = TaskRunner.merge_partials(parse_args(["-t", "6", "--merge"] + partial_paths + task_args))
+
+    with (example_path / "Q6_result2_w3_t2.json").open('r') as file:
+        assert merged == json.load(file)
+
+
+def test_merged_partials_match_task_2_without_maxk(tmp_path):
+    example_path = Path(EXAMPLES_PATH) / "Q2_examples" / "example_1"
+    partial_path = str(tmp_path / "partial_0.json.gz")
+    TaskRunner(parse_args(["-t", "2", "--export_partial", partial_path, "--shard_index", "0", "--maxk", "3",
+                           "-r", str(REMOVE_WORDS_PATH), "-s", str(example_path / "sentences_small_1.csv")]
+                          )).export_partial()
+
+    # the length of the sequences is taken from the partial results
+    merged = TaskRunner.merge_partials(parse_args(["-t", "2", "--merge", partial_path]))
+
+    with (example_path / "Q2_result1.json").open('r') as file:
+        assert merged == json.load(file)
+
+
+def test_batch_tasks_match_single_runs():
+    example_path = Path(EXAMPLES_PATH) / "Q7_examples" / "example_1"
+    shared_args = ["-r", str(REMOVE_WORDS_PATH)] + additional_args_by_task["7"]["1"] + \
+                  ["--maxk", "3", "--fixed_length", "2",
+                   "-n", str(example_path / "people_small_1.csv"),
+                   "-s", str(example_path / "sentences_small_1.csv")]
+
+    batch = TaskRunner(parse_args(["-t", "3", "5", "6", "7", "8"] + shared_args)).run_task()
+
+    for task_num in ["3", "5", "6", "7", "8"]:
+        single = TaskRunner(parse_args(["-t", task_num] + shared_args)).run_task()
+        assert batch[f"Question {task_num}"] == single[f"Question {task_num}"]
+
+
+@pytest.mark.parametrize("example_num", ["1", "2", "3", "4"])
+def test_suffix_array_search_matches_task_4(tmp_path, example_num):
+    example_path = Path(EXAMPLES_PATH) / "Q4_examples" / f"example_{example_num}"
+    suffix_array_path = str(tmp_path / "sentences.sa")
+    args = parse_args(["-t", "4", "-r", str(REMOVE_WORDS_PATH), "--suffix_array", suffix_array_path,
+                       "-s", str(example_path / f"sentences_small_{example_num}.csv")]
+                      + additional_args_by_task["4"][example_num])
+
+    with (example_path / f"Q4_result{example_num}.json").open('r') as file:
+        expected_results = json.load(file)
+    # the first run builds and writes the suffix array, the second one loads it
+    assert TaskRunner(args).run_task() == expected_results
+    assert TaskRunner(args).run_task() == expected_results
+
+
+def test_top_sequence_estimates_bound_task_2_counts():
+    example_path = Path(EXAMPLES_PATH) / "Q2_examples" / "example_3"
+    base_args = ["-t", "2", "-r", str(REMOVE_WORDS_PATH), "--maxk", "3",
+                 "-n", str(example_path / "people_small_3.csv"),
+                 "-s", str(example_path / "sentences_small_3.csv")]
+    exact = TaskRunner(parse_args(base_args)).run_task()["Question 2"]["3-Seq Counts"]
+    top = TaskRunner(parse_args(base_args + ["--top", "5", "--sketch_capacity", "20"])).run_task()
+
+    for (_, exact_counts), (_, estimates) in zip(exact, top["Question 2"]["3-Seq Top 5 Estimates"]):
+        exact_counts = dict(exact_counts)
+        assert len(estimates) == min(5, len(exact_counts))
+        for sequence, count, error in estimates:
+            assert count - error <= exact_counts[sequence] <= count
+
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson"])
+def test_streamed_results_match_run_task(tmp_path, output_format):
+    example_path = Path(EXAMPLES_PATH) / "Q5_examples" / "example_2"
+    args = parse_args(["-t", "2", "5", "-r", str(REMOVE_WORDS_PATH), "--maxk", "4",
+                       "-n", str(example_path / "people_small_2.csv"),
+                       "-s", str(example_path / "sentences_small_2.csv")])
+    output_path = tmp_path / f"result.{output_format}"
+    write_result(TaskRunner(args).run_task(stream=True), output_format, str(output_path))
+
+    if output_format == "json":
+        streamed = json.loads(output_path.read_text())
+    else:
+        streamed = {}
+        for line in output_path.read_text().splitlines():
+            (question, task_result), = json.loads(line).items()
+            (name, item), = task_result.items()
+            streamed.setdefault(question, {}).setdefault(name, []).append(item)
+    assert streamed == TaskRunner(args).run_task()
+
+
+def test_cached_results_skip_loading(tmp_path, monkeypatch):
+    example_path = Path(EXAMPLES_PATH) / "Q7_examples" / "example_1"
+    args = parse_args(["-t", "3", "7", "-r", str(REMOVE_WORDS_PATH), "--result_cache", str(tmp_path)]
+                      + additional_args_by_task["7"]["1"] +
+                      ["-n", str(example_path / "people_small_1.csv"),
+                       "-s", str(example_path / "sentences_small_1.csv")])
+    computed = TaskRunner(args).run_task()
+
+    # the input files keep their size and modification time, so they aren't hashed again
+    def hash_files(paths):
+        raise AssertionError("input files were hashed")
+    monkeypatch.setattr(files_utils, "hash_files", hash_files)
+    runner = TaskRunner(args)
+    assert runner.run_task() == computed
+    assert runner._analyzer is None
+    monkeypatch.undo()
+
+    with (example_path / "Q7_result1_w5_t2.json").open('r') as file:
+        assert computed["Question 7"] == json.load(file)["Question 7"]
+
+
+def test_fixed_length_path_search_prunes_and_reports_exhausted_budget():
+    chain = Graph([["a", "b"], ["b", "c"], ["c", "d"]])
+    # d is 4 nodes away from a, and the component has only 4 nodes
+    assert chain.has_path_of_length("a", "d", 2, 3) is False
+    assert chain.has_path_of_length("a", "d", 5, 6) is False
+    assert chain.has_path_of_length("a", "d", 4, 4) is True
+
+    clique = Graph([[str(a), str(b)] for a in range(6) for b in range(a + 1, 6)])
+    assert clique.has_path_of_length("0", "5", 6, 6) is True
+    assert clique.has_path_of_length("0", "5", 6, 6, search_budget=2) is None
+    assert clique.batch_has_path_of_length([("0", "5"), ("1", "5"), ("0", "0")], 6, 6, search_budget=2) == \
+        [None, None, False]
+
+
+def test_appended_batches_match_fresh_build(tmp_path):
+    example_path = os.path.join(EXAMPLES_PATH, "Q6_examples", "example_3")
+    sentences = pd.read_csv(os.path.join(example_path, "sentences_small_3.csv"), dtype=str)
+    persons = pd.read_csv(os.path.join(example_path, "people_small_3.csv"), dtype=str).fillna('')
+    window_sizes = [1, 3, 5]
+
+    def queries(analyzer):
+        return ([analyzer.find_connections(window_size, 1) for window_size in window_sizes],
+                analyzer.count_person_mentions(), analyzer.count_sequences(3), analyzer.people_context(3))
+
+    sentences.iloc[:10].to_csv(tmp_path / "sentences.csv", index=False)
+    persons.iloc[:5].to_csv(tmp_path / "people.csv", index=False)
+    analyzer = TextAnalyzer(str(tmp_path / "sentences.csv"), str(tmp_path / "people.csv"), REMOVE_WORDS_PATH)
+    queries(analyzer)  # compute everything that is updated in place
+
+    sentence_rows = sentences.iloc[:, 0].tolist()
+    person_rows = persons.values.tolist()
+    analyzer.append_sentences(sentence_rows[10:18])
+    analyzer.add_persons(person_rows[5:11])
+    analyzer.append_sentences(sentence_rows[18:19])
+    queries(analyzer)
+    analyzer.add_persons(person_rows[11:])
+    analyzer.append_sentences(sentence_rows[19:])
+
+    fresh = TextAnalyzer(os.path.join(example_path, "sentences_small_3.csv"),
+                         os.path.join(example_path, "people_small_3.csv"), REMOVE_WORDS_PATH)
+    assert json.loads(json.dumps(queries(analyzer), default=json_default)) == \
+        json.loads(json.dumps(queries(fresh), default=json_default))
+
+
+def test_server_answers_queries_and_errors(monkeypatch):
+    example_path = Path(EXAMPLES_PATH) / "Q6_examples" / "example_1"
+    analyzer = TextAnalyzer(str(example_path / "sentences_small_1.csv"), str(example_path / "people_small_1.csv"),
+                            REMOVE_WORDS_PATH)
+    task_server = TaskServer(analyzer)
+    server = task_server.create_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(query):
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/query",
+                                         data=json.dumps(query).encode(), method='POST')
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        with (example_path / "Q6_result1_w4_t4.json").open('r') as file:
+            assert post({"task": 6, "windowsize": 4, "threshold": 4}) == (200, json.load(file))
+        assert post({"task": 6, "windowsize": 4}) == (400, {"error": "Missing argument for task 6: threshold"})
+        assert post({"task": 9}) == (400, {"error": "Invalid task number: 9"})
+
+        # concurrent queries fill the same lazy caches
+        queries = [{"task": 2, "maxk": 3}, {"task": 5, "maxk": 2}, {"task": 6, "windowsize": 3, "threshold": 2},
+                   {"task": 8, "pairs": [["harry", "ron"]], "windowsize": 3, "threshold": 2, "fixed_length": 3}] * 2
+        expected = [json.loads(json.dumps(TaskServer(TextAnalyzer(
+            str(example_path / "sentences_small_1.csv"), str(example_path / "people_small_1.csv"),
+            REMOVE_WORDS_PATH)).answer(query), default=json_default)) for query in queries]
+        responses = [None] * len(queries)
+        threads = [threading.Thread(target=lambda i: responses.__setitem__(i, post(queries[i])), args=(i,))
+                   for i in range(len(queries))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert responses == [(200, result) for result in expected]
+
+        monkeypatch.setattr(task_server, "answer", lambda query: 1 / 0)
+        assert post({"task": 3}) == (500, {"error": "ZeroDivisionError: division by zero"})
+
+        def find_connections(window_size, threshold):
+            raise KeyError("internal")
+        monkeypatch.undo()
+        monkeypatch.setattr(analyzer, "find_connections", find_connections)
+        assert post({"task": 6, "windowsize": 4, "threshold": 4}) == (500, {"error": "KeyError: 'internal'"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pair_counts_file_keeps_each_window_size(tmp_path):
+    example_path = Path(EXAMPLES_PATH) / "Q6_examples" / "example_1"
+    pair_counts_path = tmp_path / "pair_counts.json"
+    input_args = ["-r", str(REMOVE_WORDS_PATH), "-n", str(example_path / "people_small_1.csv"),
+                  "-s", str(example_path / "sentences_small_1.csv"), "--pair_counts", str(pair_counts_path)]
+
+    TaskRunner(parse_args(["-t", "6", "--windowsize", "4", "--threshold", "4"] + input_args)).run_task()
+    TaskRunner(parse_args(["-t", "6", "--windowsize", "3", "--threshold", "4"] + input_args)).run_task()
+    assert set(json.loads(pair_counts_path.read_text())["windows"]) == {"3", "4"}
+
+    # loaded counts and tasks without pairs don't write the file
+    os.utime(pair_counts_path, ns=(0, 0))
+    runner = TaskRunner(parse_args(["-t", "3", "6", "--windowsize", "4", "--threshold", "4"] + input_args))
+    result = runner.run_task()
+    assert runner.analyzer.counted_pair_windows() == []
+    assert pair_counts_path.stat().st_mtime_ns == 0
+    with (example_path / "Q6_result1_w4_t4.json").open('r') as file:
+        assert result["Question 6"] == json.load(file)["Question 6"]
+
+
+def test_cached_pair_counts_are_reused_and_bypassed(tmp_path):
+    example_path = Path(EXAMPLES_PATH) / "Q6_examples" / "example_1"
+    input_args = ["-t", "6", "--windowsize", "4", "--result_cache", str(tmp_path / "cache"),
+                  "-r", str(REMOVE_WORDS_PATH), "-n", str(example_path / "people_small_1.csv"),
+                  "-s", str(example_path / "sentences_small_1.csv")]
+
+    TaskRunner(parse_args(input_args + ["--threshold", "4"])).run_task()
+    assert len(list(tmp_path.glob("cache/pairs_*.json"))) == 1
+
+    # another threshold loads the cached counts instead of counting them again
+    runner = TaskRunner(parse_args(input_args + ["--threshold", "2"]))
+    runner.run_task()
+    assert runner.analyzer.counted_pair_windows() == []
+
+    runner = TaskRunner(parse_args(input_args + ["--threshold", "4", "--bypass_cache"]))
+    with (example_path / "Q6_result1_w4_t4.json").open('r') as file:
+        assert runner.run_task() == json.load(file)
+    assert runner.analyzer.counted_pair_windows() == [4]
+
+
+def test_sentence_view_sorts_once_and_decodes_on_access():
+    corpus = Corpus.from_sentences([["harry", "ran"], ["albus"], ["harry", "ran"], ["harry"], ["ron", "ate"]])
+    view = SentenceView(corpus, [0, 1, 2, 3, 4])
+
+    assert len(view) == 4
+    assert view.sorted_ids() is view.sorted_ids()
+    assert view.sorted_ids() == [1, 3, 2, 4]
+    assert view[0] == ["albus"] and view[-1] == ["ron", "ate"]
+    assert view[1:3] == [["harry"], ["harry", "ran"]]
+    assert list(view) == view.materialize() == [["albus"], ["harry"], ["harry", "ran"], ["ron", "ate"]]
+
+
+def test_corpus_cache_reloads_until_sentences_change(tmp_path, monkeypatch):
+    example_path = Path(EXAMPLES_PATH) / "Q1_examples" / "example_1"
+    sentences_path = tmp_path / "sentences.csv"
+    shutil.copyfile(example_path / "sentences_small_1.csv", sentences_path)
+    task_args = parse_args(["-t", "1", "--corpus_cache", str(tmp_path / "corpus.bin"), "-r", str(REMOVE_WORDS_PATH),
+                            "-n", str(example_path / "people_small_1.csv"), "-s", str(sentences_path)])
+    built = TaskRunner(task_args).run_task()
+
+    # unchanged files are recognized by their size and modification time, without hashing them
+    hashed = []
+    def hash_files(paths):
+        hashed.append(paths)
+        return original_hash_files(paths)
+    original_hash_files = files_utils.hash_files
+    with monkeypatch.context() as patch:
+        patch.setattr(files_utils, "hash_files", hash_files)
+        assert TaskRunner(task_args).run_task() == built
+        assert hashed == []
+
+        # a touched file is hashed once, and then recognized by its new modification time
+        os.utime(sentences_path, ns=(0, 0))
+        assert TaskRunner(task_args).run_task() == built
+        assert TaskRunner(task_args).run_task() == built
+        assert len(hashed) == 1
+
+    with sentences_path.open('a') as file:
+        file.write("Dobby is a free elf\n")
+    changed = TaskRunner(task_args).run_task()
+    assert changed["Question 1"]["Processed Sentences"] == \
+        built["Question 1"]["Processed Sentences"] + [["dobby", "free", "elf"]]
+
+
+def test_hasher_is_shared_by_concurrent_queries():
+    example_path = Path(EXAMPLES_PATH) / "Q5_examples" / "example_4"
+    paths = (str(example_path / "sentences_small_4.csv"), str(example_path / "people_small_4.csv"), REMOVE_WORDS_PATH)
+    expected = [TextAnalyzer(*paths).count_sequences(seq_len) for seq_len in range(1, 7)]
+    analyzer = TextAnalyzer(*paths)
+
+    results, errors = {}, []
+
+    def count(order):
+        try:
+            for seq_len in order:
+                results[(tuple(order), seq_len)] = analyzer.count_sequences(seq_len)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=count, args=(order,))
+               for order in ([1, 2, 3, 4, 5, 6], [6, 5, 4, 3, 2, 1], [3, 6, 1, 5, 2, 4])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    for (_, seq_len), counts in results.items():
+        assert counts == expected[seq_len - 1]
+
+
+def test_task_specs_match_single_runs():
+    example_path = Path(EXAMPLES_PATH) / "Q7_examples" / "example_1"
+    shared_args = ["-r", str(REMOVE_WORDS_PATH), "--pairs", str(example_path / "people_connections_1.json"),
+                   "-n", str(example_path / "people_small_1.csv"), "-s", str(example_path / "sentences_small_1.csv")]
+    specs = {
+        "6": ["--windowsize", "3", "--threshold", "2"],
+        "7": ["--windowsize", "5", "--threshold", "2", "--maximal_distance", "4"],
+        "8": ["--windowsize", "5", "--threshold", "2", "--fixed_length", "3"]
+    }
+
+    runner = TaskRunner(parse_args(["-t", "7", "--windowsize", "3", "--threshold", "1", "--maximal_distance", "1000",
+                                    "--task_spec", "6:windowsize=3,threshold=2",
+                                    "--task_spec", "7:windowsize=5,threshold=2,maximal_distance=4",
+                                    "--task_spec", "8:windowsize=5,threshold=2,fixed_length=3"] + shared_args))
+    results = runner.run_task()
+
+    assert list(results) == ["Question 7", "Question 6: windowsize=3,threshold=2",
+                             "Question 7: windowsize=5,threshold=2,maximal_distance=4",
+                             "Question 8: windowsize=5,threshold=2,fixed_length=3"]
+    for task_num, task_args in specs.items():
+        single = TaskRunner(parse_args(["-t", task_num] + task_args + shared_args)).run_task()
+        spec_result, = [value for name, value in results.items() if name.startswith(f"Question {task_num}: ")]
+        assert spec_result == single[f"Question {task_num}"]
+    # tasks 7 and 8 of the specs share the graph of window 5 and threshold 2
+    assert sorted(runner.analyzer._connection_graphs) == [(3, 1), (5, 2)]
+
+    with pytest.raises(SystemExit):
+        parse_args(["--task_spec", "6:windowsize=3,maxk=2"])